@@ -31,6 +31,7 @@ class ProfileAdmin(admin.ModelAdmin):
     list_display = ("user", "agency", "travel_radius")
     search_fields = ("user__username", "agency__name")
     list_filter = ("agency",)
+    autocomplete_fields = ("user", "agency")
 
 
 @admin.register(Invitation)
@@ -45,3 +46,4 @@ class InvitationAdmin(admin.ModelAdmin):
     )
     search_fields = ("email", "invited_by__username", "agency__name")
     list_filter = ("is_active", "agency")
+    autocomplete_fields = ("invited_by", "agency")
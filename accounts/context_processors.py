@@ -1,15 +1,15 @@
 # /workspace/shiftwise/accounts/context_processors.py
 
 import logging
-from collections import defaultdict
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.urls import reverse
 from django.utils import timezone
 
+from core.middleware import get_permission_context
 from notifications.models import Notification
-from subscriptions.models import Plan
+from subscriptions.cache import get_available_plans
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -18,21 +18,10 @@ logger = logging.getLogger(__name__)
 def user_roles_and_subscriptions(request):
     user = request.user
     is_superuser = user.is_superuser if user.is_authenticated else False
-    is_agency_owner = (
-        user.groups.filter(name="Agency Owners").exists()
-        if user.is_authenticated
-        else False
-    )
-    is_agency_manager = (
-        user.groups.filter(name="Agency Managers").exists()
-        if user.is_authenticated
-        else False
-    )
-    is_agency_staff = (
-        user.groups.filter(name="Agency Staff").exists()
-        if user.is_authenticated
-        else False
-    )
+    group_names = get_permission_context(request).group_names
+    is_agency_owner = "Agency Owners" in group_names
+    is_agency_manager = "Agency Managers" in group_names
+    is_agency_staff = "Agency Staff" in group_names
     has_active_subscription = False
     available_plans = []
     current_plan = None
@@ -52,41 +41,8 @@ def user_roles_and_subscriptions(request):
         ("custom_integrations", "Custom Integrations"),
     ]
 
-    # Retrieve all active plans
-    plans = Plan.objects.filter(is_active=True).order_by("name", "billing_cycle")
-
-    # Group plans by name
-    plan_dict = defaultdict(dict)
-    for plan in plans:
-        if plan.billing_cycle.lower() == "monthly":
-            plan_dict[plan.name]["monthly_plan"] = plan
-        elif plan.billing_cycle.lower() == "yearly":
-            plan_dict[plan.name]["yearly_plan"] = plan
-
-    # Structure available_plans as a list of dictionaries
-    for plan_name, plans in plan_dict.items():
-        # Ensure at least one plan exists
-        if not plans.get("monthly_plan") and not plans.get("yearly_plan"):
-            logger.warning(
-                f"No monthly or yearly plan found for {plan_name}. Skipping."
-            )
-            continue
-
-        # Use the description from either monthly or yearly plan
-        description = (
-            plans.get("monthly_plan").description
-            if plans.get("monthly_plan")
-            else plans.get("yearly_plan").description
-        )
-
-        available_plans.append(
-            {
-                "name": plan_name,
-                "description": description,
-                "monthly_plan": plans.get("monthly_plan", None),
-                "yearly_plan": plans.get("yearly_plan", None),
-            }
-        )
+    # Retrieve all active plans grouped by name
+    available_plans = get_available_plans()
 
     dashboard_url = ""
     if user.is_authenticated:
@@ -110,10 +66,12 @@ def user_roles_and_subscriptions(request):
                 profile = user.profile
                 agency = profile.agency or getattr(user, "owned_agency", None)
                 if agency:
-                    profile.agency = agency
-                    profile.save()
-                    if hasattr(agency, "subscription"):
-                        subscription = agency.subscription
+                    # Only owners without a linked agency need a write here
+                    if profile.agency_id != agency.id:
+                        profile.agency = agency
+                        profile.save(update_fields=["agency"])
+                    subscription = getattr(agency, "subscription", None)
+                    if subscription:
                         if (
                             subscription.is_active
                             and subscription.current_period_end > timezone.now()
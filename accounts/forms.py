@@ -12,7 +12,7 @@ from django.contrib.auth.models import Group
 from django.core.exceptions import ValidationError
 from PIL import Image, ImageOps
 
-from core.constants import AGENCY_TYPE_CHOICES, ROLE_CHOICES
+from core.constants import AGENCY_TYPE_CHOICES, DEFAULT_COUNTRY, ROLE_CHOICES
 from core.forms import AddressFormMixin
 from core.utils import assign_user_to_group, generate_unique_code
 from shiftwise.utils import geocode_address
@@ -399,7 +399,7 @@ class AgencySignUpForm(AddressFormMixin, UserCreationForm):
     country = forms.CharField(
         max_length=100,
         required=False,
-        initial="UK",
+        initial=DEFAULT_COUNTRY,
         widget=forms.TextInput(
             attrs={
                 "class": "form-control",
@@ -656,7 +656,7 @@ class AgencySignUpForm(AddressFormMixin, UserCreationForm):
                 address_line2=self.cleaned_data.get("address_line2"),
                 city=self.cleaned_data.get("city"),
                 county=self.cleaned_data.get("county"),
-                country=self.cleaned_data.get("country") or "UK",
+                country=self.cleaned_data.get("country") or DEFAULT_COUNTRY,
                 email=self.cleaned_data["agency_email"],
                 phone_number=self.cleaned_data.get("agency_phone_number"),
                 website=self.cleaned_data.get("agency_website"),
@@ -672,7 +672,7 @@ class AgencySignUpForm(AddressFormMixin, UserCreationForm):
             profile.address_line2 = self.cleaned_data.get("address_line2")
             profile.city = self.cleaned_data.get("city")
             profile.county = self.cleaned_data.get("county")
-            profile.country = self.cleaned_data.get("country") or "UK"
+            profile.country = self.cleaned_data.get("country") or DEFAULT_COUNTRY
             profile.postcode = self.cleaned_data.get("postcode")
             profile.latitude = self.cleaned_data.get("latitude")
             profile.longitude = self.cleaned_data.get("longitude")
@@ -790,7 +790,7 @@ class SignUpForm(AddressFormMixin, UserCreationForm):
     country = forms.CharField(
         max_length=100,
         required=False,
-        initial="UK",
+        initial=DEFAULT_COUNTRY,
         widget=forms.TextInput(
             attrs={
                 "class": "form-control",
@@ -1017,7 +1017,7 @@ class SignUpForm(AddressFormMixin, UserCreationForm):
                 profile.address_line2 = self.cleaned_data.get("address_line2")
                 profile.city = self.cleaned_data.get("city")
                 profile.county = self.cleaned_data.get("county")
-                profile.country = self.cleaned_data.get("country") or "UK"
+                profile.country = self.cleaned_data.get("country") or DEFAULT_COUNTRY
                 profile.postcode = self.cleaned_data.get("postcode")
                 profile.latitude = self.cleaned_data.get("latitude")
                 profile.longitude = self.cleaned_data.get("longitude")
@@ -1196,7 +1196,7 @@ class AcceptInvitationForm(UserCreationForm):
                 profile.address_line2 = self.cleaned_data.get("address_line2")
                 profile.city = self.cleaned_data.get("city")
                 profile.county = self.cleaned_data.get("county")
-                profile.country = self.cleaned_data.get("country") or "UK"
+                profile.country = self.cleaned_data.get("country") or DEFAULT_COUNTRY
                 profile.postcode = self.cleaned_data.get("postcode")
                 profile.latitude = self.cleaned_data.get("latitude")
                 profile.longitude = self.cleaned_data.get("longitude")
@@ -1772,7 +1772,7 @@ class StaffCreationForm(AddressFormMixin, UserCreationForm):
     country = forms.CharField(
         max_length=100,
         required=False,
-        initial="UK",
+        initial=DEFAULT_COUNTRY,
         widget=forms.TextInput(
             attrs={
                 "class": "form-control",
@@ -1997,7 +1997,7 @@ class StaffCreationForm(AddressFormMixin, UserCreationForm):
                 profile.address_line2 = self.cleaned_data.get("address_line2")
                 profile.city = self.cleaned_data.get("city")
                 profile.county = self.cleaned_data.get("county")
-                profile.country = self.cleaned_data.get("country") or "UK"
+                profile.country = self.cleaned_data.get("country") or DEFAULT_COUNTRY
                 profile.postcode = self.cleaned_data.get("postcode")
                 profile.latitude = self.cleaned_data.get("latitude")
                 profile.longitude = self.cleaned_data.get("longitude")
@@ -2125,7 +2125,7 @@ class StaffUpdateForm(AddressFormMixin, forms.ModelForm):
     country = forms.CharField(
         max_length=100,
         required=False,
-        initial="UK",
+        initial=DEFAULT_COUNTRY,
         widget=forms.TextInput(
             attrs={
                 "class": "form-control",
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-14 03:09
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0023_alter_agency_owner"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="agency",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="agency_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
@@ -5,11 +5,12 @@ import logging
 import uuid
 
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.utils import timezone
 from encrypted_model_fields.fields import EncryptedCharField
 
-from core.constants import AGENCY_TYPE_CHOICES, ROLE_CHOICES
+from core.constants import AGENCY_TYPE_CHOICES, DEFAULT_COUNTRY, ROLE_CHOICES
 from core.utils import create_unique_filename, generate_unique_code
 
 logger = logging.getLogger(__name__)
@@ -53,13 +54,20 @@ class Agency(models.Model):
     address_line2 = models.CharField(max_length=255, blank=True, null=True)
     city = models.CharField(max_length=100, blank=True, null=True)
     county = models.CharField(max_length=100, blank=True, null=True)
-    country = models.CharField(max_length=100, default="UK", blank=True, null=True)
+    country = models.CharField(
+        max_length=100, default=DEFAULT_COUNTRY, blank=True, null=True
+    )
     postcode = models.CharField(max_length=20, blank=True, null=True)
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
 
     class Meta:
         verbose_name_plural = "Agencies"
+        indexes = [
+            GinIndex(
+                fields=["name"], name="agency_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ]
 
     def __str__(self):
         return f"{self.agency_code} - {self.name}"
@@ -110,7 +118,9 @@ class Profile(models.Model):
     address_line2 = models.CharField(max_length=255, blank=True, null=True)
     city = models.CharField(max_length=100, blank=True, null=True)
     county = models.CharField(max_length=100, blank=True, null=True)
-    country = models.CharField(max_length=100, default="UK", blank=True, null=True)
+    country = models.CharField(
+        max_length=100, default=DEFAULT_COUNTRY, blank=True, null=True
+    )
     postcode = models.CharField(max_length=20, blank=True, null=True)
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
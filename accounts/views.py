@@ -572,7 +572,7 @@ class SuperuserDashboardView(LoginRequiredMixin, SuperuserRequiredMixin, View):
     def get(self, request, *args, **kwargs):
         # Display all agencies and users
         agencies = Agency.objects.all()
-        users = User.objects.all()
+        users = User.objects.prefetch_related("groups")
 
         context = {
             "agencies": agencies,
@@ -888,10 +888,11 @@ class UserListView(
     context_object_name = "users"
 
     def get_queryset(self):
+        queryset = User.objects.prefetch_related("groups")
         if self.request.user.is_superuser:
-            return User.objects.all()
+            return queryset
         else:
-            return User.objects.filter(profile__agency=self.request.user.profile.agency)
+            return queryset.filter(profile__agency=self.request.user.profile.agency)
 
 
 class UserCreateView(
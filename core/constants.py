@@ -50,3 +50,6 @@ STAFF_PERFORMANCE_STATUS_CHOICES = [
     ("Average", "Average"),
     ("Poor", "Poor"),
 ]
+
+# Default country for addresses
+DEFAULT_COUNTRY = "UK"
@@ -0,0 +1,131 @@
+# /workspace/shiftwise/core/middleware.py
+
+import logging
+
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from accounts.models import Profile
+from subscriptions.models import Plan
+
+logger = logging.getLogger(__name__)
+
+
+class PermissionContext:
+    """
+    Snapshot of everything the permission mixins need to know about a user,
+    loaded once per request.
+    """
+
+    def __init__(
+        self,
+        is_superuser=False,
+        profile=None,
+        agency=None,
+        group_names=frozenset(),
+        subscription=None,
+        feature_set=frozenset(),
+    ):
+        self.is_superuser = is_superuser
+        self.profile = profile
+        self.agency = agency
+        self.group_names = group_names
+        self.subscription = subscription
+        self.feature_set = feature_set
+
+    @property
+    def agency_id(self):
+        return self.agency.id if self.agency else None
+
+    @property
+    def subscription_plan_id(self):
+        return self.subscription.plan_id if self.subscription else None
+
+    @property
+    def has_active_subscription(self):
+        return self.subscription is not None
+
+
+def build_permission_context(user):
+    """
+    Builds the PermissionContext for the given user with one query for the
+    groups plus one for the profile, agency, subscription and plan.
+    """
+    if not user.is_authenticated:
+        return PermissionContext()
+
+    # Prefetch onto the user itself so has_group and user.groups.all() in
+    # templates reuse the same cache
+    prefetch_related_objects([user], "groups")
+    group_names = frozenset(group.name for group in user.groups.all())
+
+    profile = (
+        Profile.objects.select_related("agency__subscription__plan")
+        .filter(user=user)
+        .first()
+    )
+    agency = None
+    if profile:
+        # Cache the loaded profile so request.user.profile does not refetch it
+        user.profile = profile
+        agency = profile.agency
+
+    subscription = getattr(agency, "subscription", None) if agency else None
+    if subscription and not (
+        subscription.is_active
+        and subscription.current_period_end
+        and subscription.current_period_end > timezone.now()
+    ):
+        subscription = None
+
+    if user.is_superuser:
+        feature_set = frozenset(Plan.FEATURE_FIELDS)
+    elif subscription:
+        feature_set = frozenset(subscription.plan.get_features_list())
+    else:
+        feature_set = frozenset()
+
+    return PermissionContext(
+        is_superuser=user.is_superuser,
+        profile=profile,
+        agency=agency,
+        group_names=group_names,
+        subscription=subscription,
+        feature_set=feature_set,
+    )
+
+
+def get_permission_context(request):
+    """
+    Returns the request's PermissionContext, building it if the middleware
+    has not attached one (e.g. requests built with RequestFactory).
+    """
+    perm_ctx = getattr(request, "perm_ctx", None)
+    if perm_ctx is None:
+        perm_ctx = build_permission_context(request.user)
+        request.perm_ctx = perm_ctx
+    return perm_ctx
+
+
+def get_current_agency(request):
+    """
+    Returns the agency of the request's user, or None.
+    """
+    return get_permission_context(request).agency
+
+
+class PermissionContextMiddleware:
+    """
+    Attaches a lazily evaluated PermissionContext to request.perm_ctx.
+    Must be placed after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.perm_ctx = SimpleLazyObject(
+            lambda: build_permission_context(request.user)
+        )
+        return self.get_response(request)
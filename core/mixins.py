@@ -5,50 +5,76 @@ import logging
 from django.contrib import messages
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.shortcuts import redirect
-from django.utils import timezone
+from django.urls import reverse_lazy
+from django.utils.functional import cached_property
+
+from core.middleware import get_permission_context
 
 logger = logging.getLogger(__name__)
 
+# Redirect targets for handle_no_permission
+LOGIN_URL = reverse_lazy("accounts:login_view")
+HOME_URL = reverse_lazy("home:home")
+SUBSCRIPTION_URL = reverse_lazy("subscriptions:subscription_home")
+
+
+class PermissionContextMixin(UserPassesTestMixin):
+    """
+    Base mixin giving access to the request's cached PermissionContext.
+    """
+
+    @cached_property
+    def perm_ctx(self):
+        return get_permission_context(self.request)
 
-class SuperuserRequiredMixin(UserPassesTestMixin):
+
+class SuperuserRequiredMixin(PermissionContextMixin):
     """Mixin to ensure that the user is a superuser."""
 
     def test_func(self):
-        return self.request.user.is_superuser
+        return self.perm_ctx.is_superuser
 
     def handle_no_permission(self):
         messages.error(self.request, "You do not have permission to access this page.")
-        return redirect("accounts:login_view")
+        return redirect(LOGIN_URL)
+
+
+class GroupCheckMixin(PermissionContextMixin):
+    """
+    Base mixin that loads the user's group names once per request.
+    """
+
+    @cached_property
+    def user_group_names(self):
+        return self.perm_ctx.group_names
 
 
-class AgencyOwnerRequiredMixin(UserPassesTestMixin):
+class AgencyOwnerRequiredMixin(GroupCheckMixin):
     """
     Mixin to ensure that the user is an agency owner or superuser.
     """
 
     def test_func(self):
-        user = self.request.user
-        return user.is_superuser or user.groups.filter(name="Agency Owners").exists()
+        return self.perm_ctx.is_superuser or "Agency Owners" in self.user_group_names
 
     def handle_no_permission(self):
         messages.error(self.request, "You do not have permission to access this page.")
         logger.warning(
             f"User {self.request.user.username} attempted to access an owner-only page without permissions."
         )
-        return redirect("home:home")
+        return redirect(HOME_URL)
 
 
-class AgencyManagerRequiredMixin(UserPassesTestMixin):
+class AgencyManagerRequiredMixin(GroupCheckMixin):
     """
     Mixin to ensure that the user is an agency manager, agency owner, or superuser.
     """
 
     def test_func(self):
-        user = self.request.user
         return (
-            user.is_superuser
-            or user.groups.filter(name="Agency Owners").exists()
-            or user.groups.filter(name="Agency Managers").exists()
+            self.perm_ctx.is_superuser
+            or "Agency Owners" in self.user_group_names
+            or "Agency Managers" in self.user_group_names
         )
 
     def handle_no_permission(self):
@@ -56,21 +82,17 @@ class AgencyManagerRequiredMixin(UserPassesTestMixin):
         logger.warning(
             f"User {self.request.user.username} attempted to access a manager-only page without permissions."
         )
-        return redirect("home:home")
+        return redirect(HOME_URL)
 
 
-class AgencyStaffRequiredMixin(UserPassesTestMixin):
+class AgencyStaffRequiredMixin(GroupCheckMixin):
     """
     Mixin to ensure that the user is agency staff, agency manager, agency owner, or superuser.
     """
 
     def test_func(self):
-        user = self.request.user
-        return (
-            user.is_superuser
-            or user.groups.filter(
-                name__in=["Agency Owners", "Agency Managers", "Agency Staff"]
-            ).exists()
+        return self.perm_ctx.is_superuser or not self.user_group_names.isdisjoint(
+            {"Agency Owners", "Agency Managers", "Agency Staff"}
         )
 
     def handle_no_permission(self):
@@ -80,15 +102,27 @@ class AgencyStaffRequiredMixin(UserPassesTestMixin):
         logger.warning(
             f"User {self.request.user.username} attempted to access a staff-only page without permissions."
         )
-        return redirect("home:home")
+        return redirect(HOME_URL)
 
 
-class SubscriptionRequiredMixin(UserPassesTestMixin):
+class RequiredFeaturesMixin(PermissionContextMixin):
     """
-    Mixin to ensure that the user's agency has an active subscription.
+    Base mixin for views gated on subscription features. Each subclass's
+    required_features is frozen into a frozenset when the class is created,
+    so the per-request check is a single subset test.
     """
 
-    required_features = []  # List of features required to access the view
+    required_features = frozenset()  # Features required to access the view
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.required_features = frozenset(cls.required_features)
+
+
+class SubscriptionRequiredMixin(RequiredFeaturesMixin):
+    """
+    Mixin to ensure that the user's agency has an active subscription.
+    """
 
     def test_func(self):
         user = self.request.user
@@ -96,51 +130,33 @@ class SubscriptionRequiredMixin(UserPassesTestMixin):
             return True
         if not user.is_authenticated:
             return False
-        try:
-            agency = user.profile.agency
-            if not agency:
-                return False
-            subscription = agency.subscription
-            if not (
-                subscription
-                and subscription.is_active
-                and subscription.current_period_end > timezone.now()
-            ):
-                return False
-            plan = subscription.plan
-            if plan and self.required_features:
-                for feature in self.required_features:
-                    if not getattr(plan, feature, False):
-                        return False
-            return True
-        except Exception as e:
-            logger.exception(
-                f"Error in SubscriptionRequiredMixin for user {user.username}: {e}"
-            )
-            return False
+        perm_ctx = self.perm_ctx
+        return (
+            perm_ctx.has_active_subscription
+            and self.required_features <= perm_ctx.feature_set
+        )
 
     def handle_no_permission(self):
         user = self.request.user
-        # Clear existing messages
-        messages.get_messages(self.request)
+        # Clear existing messages; marking the storage as used drops the
+        # previously stored messages without iterating over them
+        messages.get_messages(self.request).used = True
         if not user.is_authenticated:
             messages.error(self.request, "You must be logged in to access this page.")
-            return redirect("accounts:login_view")
+            return redirect(LOGIN_URL)
         else:
             messages.error(
                 self.request,
                 "Your agency does not have the necessary subscription to access this page.",
             )
-            return redirect("subscriptions:subscription_home")
+            return redirect(SUBSCRIPTION_URL)
 
 
-class FeatureRequiredMixin(UserPassesTestMixin):
+class FeatureRequiredMixin(RequiredFeaturesMixin):
     """
     Mixin to ensure that the user's subscription includes specific features.
     """
 
-    required_features = []  # List of features required to access the view
-
     def test_func(self):
         if not self.required_features:
             return True  # No feature required
@@ -149,24 +165,16 @@ class FeatureRequiredMixin(UserPassesTestMixin):
             return True
         if not user.is_authenticated:
             return False
-        try:
-            return all(
-                user.profile.has_feature(feature) for feature in self.required_features
-            )
-        except AttributeError:
-            logger.exception(
-                f"User {user.username} does not have a profile or 'has_feature' method."
-            )
-            return False
+        return self.required_features <= self.perm_ctx.feature_set
 
     def handle_no_permission(self):
         user = self.request.user
         if not user.is_authenticated:
             messages.error(self.request, "You must be logged in to access this page.")
-            return redirect("accounts:login_view")
+            return redirect(LOGIN_URL)
         else:
             messages.error(
                 self.request,
                 "You do not have the necessary subscription features to access this page.",
             )
-            return redirect("subscriptions:subscription_home")
+            return redirect(SUBSCRIPTION_URL)
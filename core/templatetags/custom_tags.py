@@ -1,6 +1,7 @@
 # /workspace/shiftwise/core/templatetags/custom_tags.py
 
 from django import template
+from django.db.models import prefetch_related_objects
 
 from shiftwise.utils import haversine_distance
 from subscriptions.models import Plan
@@ -10,8 +11,15 @@ register = template.Library()
 
 @register.filter(name="has_group")
 def has_group(user, group_name):
-    """Check if a user belongs to a group with the given name."""
-    return user.groups.filter(name=group_name).exists()
+    """
+    Check if a user belongs to a group with the given name.
+    Groups are prefetched onto the user so repeated calls in a template
+    are served from the prefetch cache.
+    """
+    if not user.is_authenticated:
+        return False
+    prefetch_related_objects([user], "groups")
+    return group_name in {group.name for group in user.groups.all()}
 
 
 @register.simple_tag
@@ -1,9 +1,13 @@
 # /workspace/shiftwise/core/tests.py
 
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser, Group
 from django.core import mail
 from django.test import TestCase
 
+from .middleware import build_permission_context
+from .templatetags.custom_tags import has_group
 from .utils import send_email_notification
 
 
@@ -34,3 +38,41 @@ class EmailNotificationTests(TestCase):
 
         # Restore original email backend
         settings.EMAIL_BACKEND = original_backend
+
+
+class HasGroupFilterTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username="owner", email="owner@example.com", password="pass"
+        )
+        self.user.groups.add(Group.objects.create(name="Agency Owners"))
+
+    def test_has_group_reuses_prefetched_groups(self):
+        self.assertTrue(has_group(self.user, "Agency Owners"))
+        with self.assertNumQueries(0):
+            self.assertTrue(has_group(self.user, "Agency Owners"))
+            self.assertFalse(has_group(self.user, "Agency Staff"))
+
+
+class PermissionContextTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username="manager", email="manager@example.com", password="pass"
+        )
+        self.user.groups.add(Group.objects.create(name="Agency Managers"))
+
+    def test_build_permission_context_loads_user_state_once(self):
+        with self.assertNumQueries(2):
+            perm_ctx = build_permission_context(self.user)
+        self.assertFalse(perm_ctx.is_superuser)
+        self.assertEqual(perm_ctx.group_names, frozenset({"Agency Managers"}))
+        self.assertIsNone(perm_ctx.agency_id)
+        self.assertFalse(perm_ctx.has_active_subscription)
+        self.assertEqual(perm_ctx.feature_set, frozenset())
+
+    def test_anonymous_user_gets_empty_context_without_queries(self):
+        with self.assertNumQueries(0):
+            perm_ctx = build_permission_context(AnonymousUser())
+        self.assertEqual(perm_ctx.group_names, frozenset())
@@ -24,7 +24,7 @@ class NotificationListView(
     Displays a list of notifications for the user.
     """
 
-    required_features = ["notifications_enabled"]
+    required_features = frozenset({"notifications_enabled"})
     model = Notification
     template_name = "notifications/notification_list.html"
     context_object_name = "notifications"
@@ -41,7 +41,7 @@ class MarkNotificationReadView(LoginRequiredMixin, FeatureRequiredMixin, View):
     Marks a notification as read via AJAX.
     """
 
-    required_features = ["notifications_enabled"]
+    required_features = frozenset({"notifications_enabled"})
 
     @method_decorator(csrf_protect)
     def post(self, request, notification_id, *args, **kwargs):
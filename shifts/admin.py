@@ -5,7 +5,7 @@ from decimal import Decimal
 
 from django.contrib import admin
 from django.contrib.admin import SimpleListFilter
-from django.db.models import Count, ExpressionWrapper, F, FloatField, Sum
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum
 from django.urls import reverse
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
@@ -15,6 +15,20 @@ from .models import Shift, ShiftAssignment, StaffPerformance
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+
+def is_changelist_request(request, model_admin):
+    """
+    Returns True if the request is for the model admin's changelist page,
+    where only the list_display columns need to be loaded.
+    """
+    opts = model_admin.model._meta
+    match = request.resolver_match
+    return (
+        match is not None
+        and match.url_name == f"{opts.app_label}_{opts.model_name}_changelist"
+    )
+
+
 # ---------------------------
 # Custom List Filters
 # ---------------------------
@@ -71,6 +85,7 @@ class ShiftAssignmentInline(admin.TabularInline):
 
     model = ShiftAssignment
     extra = 0
+    autocomplete_fields = ("worker",)
     readonly_fields = (
         "assigned_at",
         "completion_time",
@@ -118,12 +133,14 @@ class ShiftAdmin(admin.ModelAdmin):
         "end_time",
         "agency",
         "status",
+        "n_assignments",
         "is_full",
         "total_hours",
         "total_pay",
         "view_shift",
     )
     list_filter = ("shift_type", "status", "agency", ShiftCapacityFilter)
+    list_select_related = ("agency",)
     search_fields = (
         "name",
         "agency__name",
@@ -135,6 +152,7 @@ class ShiftAdmin(admin.ModelAdmin):
         "assignments__worker__email",
     )
     ordering = ("shift_date", "start_time")
+    autocomplete_fields = ("agency",)
     readonly_fields = ("shift_code", "duration", "is_full", "total_hours", "total_pay")
     fieldsets = (
         (None, {"fields": ("name", "shift_code", "shift_date", "end_date")}),
@@ -162,17 +180,28 @@ class ShiftAdmin(admin.ModelAdmin):
     )
     inlines = [ShiftAssignmentInline]
 
+    @admin.display(description="Assignments", ordering="n_assignments")
+    def n_assignments(self, obj):
+        """
+        Returns the number of assignments annotated by get_queryset.
+        """
+        return obj.n_assignments
+
+    @admin.display(description="Is Full", boolean=True)
+    def is_full(self, obj):
+        """
+        Returns True if the confirmed assignments annotated by get_queryset fill the shift.
+        """
+        return obj.confirmed_count >= obj.capacity
+
     @admin.display(description="Total Hours")
     def total_hours(self, obj):
         """
         Computes the total hours for the shift by multiplying duration with confirmed assignments count.
         """
-        assignment_count = obj.assignments.filter(
-            status=ShiftAssignment.CONFIRMED
-        ).count()
         if obj.duration is None:
             return "0"
-        total = obj.duration * assignment_count
+        total = obj.duration * obj.confirmed_count
         return total
 
     @admin.display(description="Total Pay (£)")
@@ -180,10 +209,6 @@ class ShiftAdmin(admin.ModelAdmin):
         """
         Computes the total pay for the shift by multiplying duration, hourly_rate, and confirmed assignments count.
         """
-        assignment_count = obj.assignments.filter(
-            status=ShiftAssignment.CONFIRMED
-        ).count()
-
         if obj.duration is None:
             return "£0.00"
 
@@ -191,7 +216,7 @@ class ShiftAdmin(admin.ModelAdmin):
         duration_decimal = Decimal(str(obj.duration))
 
         # Perform arithmetic operations using Decimal
-        total = duration_decimal * obj.hourly_rate * assignment_count
+        total = duration_decimal * obj.hourly_rate * obj.confirmed_count
 
         # Format the total pay
         return f"£{total:.2f}"
@@ -206,12 +231,30 @@ class ShiftAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         """
-        Optimizes queryset performance by selecting related fields.
+        Optimizes queryset performance by selecting related fields and
+        annotating the assignment counts used by the computed columns.
         """
         queryset = super().get_queryset(request)
-        queryset = queryset.select_related("agency").prefetch_related(
-            "assignments__worker"
+        queryset = queryset.select_related("agency").annotate(
+            n_assignments=Count("assignments"),
+            confirmed_count=Count(
+                "assignments", filter=Q(assignments__status=ShiftAssignment.CONFIRMED)
+            ),
         )
+        if is_changelist_request(request, self):
+            # Load only the columns used by list_display and ordering
+            queryset = queryset.only(
+                "name",
+                "shift_date",
+                "start_time",
+                "end_time",
+                "status",
+                "capacity",
+                "duration",
+                "hourly_rate",
+                "agency__agency_code",
+                "agency__name",
+            )
         return queryset
 
 
@@ -238,6 +281,7 @@ class ShiftAssignmentAdmin(admin.ModelAdmin):
         "shift__agency",
         AttendanceStatusFilter,
     )
+    list_select_related = ("worker", "shift")
     search_fields = (
         "worker__username",
         "worker__email",
@@ -246,7 +290,7 @@ class ShiftAssignmentAdmin(admin.ModelAdmin):
         "attendance_status",
     )
     ordering = ("-assigned_at",)
-    raw_id_fields = ("worker", "shift")
+    autocomplete_fields = ("worker", "shift")
     readonly_fields = ("assigned_at", "completion_time", "signature")
     fieldsets = (
         (None, {"fields": ("worker", "shift", "role", "status", "attendance_status")}),
@@ -301,6 +345,18 @@ class ShiftAssignmentAdmin(admin.ModelAdmin):
         Optimizes queryset performance by selecting related fields.
         """
         queryset = super().get_queryset(request)
+        if is_changelist_request(request, self):
+            # Load only the columns used by list_display and ordering
+            return queryset.select_related("worker", "shift").only(
+                "role",
+                "status",
+                "attendance_status",
+                "assigned_at",
+                "completion_time",
+                "worker__username",
+                "shift__name",
+                "shift__shift_date",
+            )
         queryset = queryset.select_related("worker", "shift__agency")
         return queryset
 
@@ -329,7 +385,7 @@ class StaffPerformanceAdmin(admin.ModelAdmin):
         "comments",
     )
     ordering = ("-created_at",)
-    raw_id_fields = ("worker", "shift")
+    autocomplete_fields = ("worker", "shift")
     readonly_fields = ("created_at",)
     fieldsets = (
         (None, {"fields": ("worker", "shift")}),
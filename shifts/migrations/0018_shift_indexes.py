@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-14 03:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0023_alter_agency_owner"),
+        ("shifts", "0017_shift_shift_role"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="shift",
+            index=models.Index(
+                fields=["agency", "shift_date", "start_time"],
+                name="shift_agency_date_start_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shift",
+            index=models.Index(
+                fields=["city", "shift_date"], name="shift_city_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shiftassignment",
+            index=models.Index(
+                fields=["shift", "-assigned_at"], name="assignment_shift_assigned_idx"
+            ),
+        ),
+    ]
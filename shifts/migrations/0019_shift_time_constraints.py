@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-14 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0023_alter_agency_owner"),
+        ("shifts", "0018_shift_indexes"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="shift",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("end_date__gte", models.F("shift_date"))),
+                name="shift_end_date_not_before_shift_date",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="shift",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    ("end_time__gt", models.F("start_time")),
+                    ("is_overnight", True),
+                    ("end_date__gt", models.F("shift_date")),
+                    _connector="OR",
+                ),
+                name="shift_end_after_start",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-14 03:09
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0024_agency_name_trgm"),
+        ("shifts", "0019_shift_time_constraints"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="shift",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="shift_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shift",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["city"], name="shift_city_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shift",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["postcode"],
+                name="shift_postcode_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -1,14 +1,19 @@
 # /workspace/shiftwise/shifts/models.py
 
 import uuid
+from math import cos, radians
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
 from django.urls import reverse
 from django.utils import timezone
 
+from core.constants import DEFAULT_COUNTRY
 from shifts.validators import validate_image
 
 User = get_user_model()
@@ -27,6 +32,43 @@ class TimestampedModel(models.Model):
         abstract = True
 
 
+class ShiftQuerySet(models.QuerySet):
+    """
+    QuerySet with proximity helpers evaluated in the database.
+    """
+
+    EARTH_RADIUS = {"miles": 3956, "kilometers": 6371}
+
+    def with_distance(self, latitude, longitude, unit="miles"):
+        """
+        Annotates each shift with its Haversine distance from the given
+        coordinates. Shifts without coordinates get a NULL distance.
+        """
+        lat1 = radians(float(latitude))
+        lon1 = radians(float(longitude))
+        half_dlat = (Radians(F("latitude")) - Value(lat1)) / 2
+        half_dlon = (Radians(F("longitude")) - Value(lon1)) / 2
+        a = Power(Sin(half_dlat), 2) + Value(cos(lat1)) * Cos(
+            Radians(F("latitude"))
+        ) * Power(Sin(half_dlon), 2)
+        # Clamp to 1 so floating point error cannot push ASin out of its domain
+        distance = Value(2 * self.EARTH_RADIUS[unit], output_field=FloatField()) * ASin(
+            Least(Sqrt(a), Value(1.0)), output_field=FloatField()
+        )
+        # PostgreSQL's LEAST ignores NULLs, so missing coordinates would
+        # otherwise clamp to 1 and come out as half the Earth's circumference
+        return self.annotate(
+            distance=Case(
+                When(
+                    Q(latitude__isnull=True) | Q(longitude__isnull=True),
+                    then=Value(None),
+                ),
+                default=distance,
+                output_field=FloatField(),
+            )
+        )
+
+
 class Shift(TimestampedModel):
     """
     Represents a work shift managed by an agency.
@@ -103,7 +145,7 @@ class Shift(TimestampedModel):
     address_line2 = models.CharField(max_length=255, blank=True, null=True)
     city = models.CharField(max_length=100, blank=True, null=True)
     county = models.CharField(max_length=100, blank=True, null=True)
-    country = models.CharField(max_length=100, default="UK")
+    country = models.CharField(max_length=100, default=DEFAULT_COUNTRY)
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
     shift_type = models.CharField(
@@ -131,11 +173,45 @@ class Shift(TimestampedModel):
         help_text="Indicates whether the shift is active and available for assignments.",
     )
 
+    objects = ShiftQuerySet.as_manager()
+
     class Meta:
         unique_together = ("agency", "shift_date", "name")
         ordering = ["shift_date", "start_time"]
         verbose_name = "Shift"
         verbose_name_plural = "Shifts"
+        indexes = [
+            models.Index(
+                fields=["agency", "shift_date", "start_time"],
+                name="shift_agency_date_start_idx",
+            ),
+            models.Index(fields=["city", "shift_date"], name="shift_city_date_idx"),
+            # Trigram indexes back the admin's icontains searches
+            GinIndex(
+                fields=["name"], name="shift_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+            GinIndex(
+                fields=["city"], name="shift_city_trgm", opclasses=["gin_trgm_ops"]
+            ),
+            GinIndex(
+                fields=["postcode"],
+                name="shift_postcode_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
+        constraints = [
+            # Mirrors clean() so bulk updates and fixtures cannot bypass it
+            models.CheckConstraint(
+                condition=Q(end_date__gte=F("shift_date")),
+                name="shift_end_date_not_before_shift_date",
+            ),
+            models.CheckConstraint(
+                condition=Q(end_time__gt=F("start_time"))
+                | Q(is_overnight=True)
+                | Q(end_date__gt=F("shift_date")),
+                name="shift_end_after_start",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} on {self.shift_date}"
@@ -318,6 +394,11 @@ class ShiftAssignment(TimestampedModel):
         ordering = ["-assigned_at"]
         verbose_name = "Shift Assignment"
         verbose_name_plural = "Shift Assignments"
+        indexes = [
+            models.Index(
+                fields=["shift", "-assigned_at"], name="assignment_shift_assigned_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.worker} assigned to {self.shift.name} on {self.shift.shift_date}"
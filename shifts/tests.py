@@ -3,12 +3,15 @@
 from datetime import date, time, timedelta
 
 from django.contrib.auth.models import Group
+from django.db import IntegrityError, transaction
 from django.test import Client, TestCase
 from django.urls import reverse
 from django.utils import timezone
 
 from accounts.models import Agency, Profile, User
 
+from shiftwise.utils import haversine_distance
+
 from .models import Shift, ShiftAssignment
 
 
@@ -135,3 +138,75 @@ class ShiftListViewTestCase(TestCase):
             51.5074, -0.1278, 48.8566, 2.3522, unit="kilometers"
         )
         self.assertAlmostEqual(distance, 343.5, delta=1.0)
+
+
+class ShiftDistanceTestCase(TestCase):
+    def test_with_distance_annotates_in_database(self):
+        agency = Agency.objects.create(name="Geo Agency", email="geo@test.com")
+        tomorrow = date.today() + timedelta(days=1)
+        for name, lat, lon in [
+            ("Westminster", 51.4995, -0.1248),
+            ("Paris", 48.8566, 2.3522),
+            ("Unknown", None, None),
+            ("No longitude", 51.5074, None),
+        ]:
+            Shift.objects.create(
+                name=name,
+                shift_date=tomorrow,
+                end_date=tomorrow,
+                start_time=time(9, 0),
+                end_time=time(17, 0),
+                agency=agency,
+                latitude=lat,
+                longitude=lon,
+                hourly_rate=15.00,
+            )
+
+        distances = dict(
+            Shift.objects.with_distance(
+                51.5074, -0.1278, unit="kilometers"
+            ).values_list("name", "distance")
+        )
+        self.assertAlmostEqual(
+            distances["Paris"],
+            haversine_distance(51.5074, -0.1278, 48.8566, 2.3522, unit="kilometers"),
+            places=3,
+        )
+        self.assertLess(distances["Westminster"], 1)
+        self.assertIsNone(distances["Unknown"])
+        self.assertIsNone(distances["No longitude"])
+
+
+class ShiftConstraintTestCase(TestCase):
+    def setUp(self):
+        self.agency = Agency.objects.create(
+            name="Constraint Agency", email="constraint@test.com"
+        )
+        self.tomorrow = date.today() + timedelta(days=1)
+
+    def create_shift(self, **kwargs):
+        return Shift.objects.create(
+            name="Constraint Shift",
+            shift_date=self.tomorrow,
+            end_date=self.tomorrow,
+            start_time=time(9, 0),
+            end_time=time(17, 0),
+            agency=self.agency,
+            hourly_rate=15.00,
+            **kwargs,
+        )
+
+    def test_bulk_update_cannot_end_before_start(self):
+        shift = self.create_shift()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Shift.objects.filter(pk=shift.pk).update(end_time=time(8, 0))
+
+    def test_overnight_shift_may_end_before_start_time(self):
+        shift = self.create_shift(is_overnight=True)
+        Shift.objects.filter(pk=shift.pk).update(
+            start_time=time(22, 0),
+            end_time=time(6, 0),
+            end_date=self.tomorrow + timedelta(days=1),
+        )
+        shift.refresh_from_db()
+        self.assertEqual(shift.end_time, time(6, 0))
@@ -49,7 +49,7 @@ class APIAccessView(LoginRequiredMixin, FeatureRequiredMixin, TemplateView):
     """
 
     template_name = "shifts/api_access.html"
-    required_features = ["custom_integrations"]
+    required_features = frozenset({"custom_integrations"})
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
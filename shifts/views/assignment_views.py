@@ -23,7 +23,7 @@ class AssignWorkerView(
     Handles POST requests from the Shift Detail page.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
 
     def post(self, request, shift_id, *args, **kwargs):
         user = request.user
@@ -109,7 +109,7 @@ class UnassignWorkerView(
     Handles POST requests from the Shift Detail page.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
 
     def post(self, request, shift_id, assignment_id, *args, **kwargs):
         user = request.user
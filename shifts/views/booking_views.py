@@ -30,7 +30,7 @@ class ShiftBookView(
     Allows agency staff to book a shift based on availability and proximity.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
 
     def post(self, request, shift_id, *args, **kwargs):
         user = request.user
@@ -119,7 +119,7 @@ class ShiftUnbookView(
     Allows agency staff to unbook a shift.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
 
     def post(self, request, shift_id, *args, **kwargs):
         user = request.user
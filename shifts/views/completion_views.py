@@ -41,7 +41,7 @@ class ShiftCompleteView(
     Superusers can complete any shift without agency restrictions.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
 
     def get(self, request, shift_id, *args, **kwargs):
         shift = get_object_or_404(Shift, id=shift_id, is_active=True)
@@ -215,7 +215,7 @@ class ShiftCompleteForUserView(
     Useful in scenarios where the user cannot complete the shift themselves.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
 
     def get(self, request, shift_id, user_id, *args, **kwargs):
         shift = get_object_or_404(Shift, id=shift_id, is_active=True)
@@ -410,7 +410,7 @@ class ShiftCompleteAjaxView(
     Superusers can complete any shift without agency restrictions.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
 
     def post(self, request, shift_id, *args, **kwargs):
         user = request.user
@@ -6,6 +6,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView
 
+from core.middleware import get_current_agency
 from core.mixins import FeatureRequiredMixin
 from notifications.models import Notification
 from shifts.models import Shift
@@ -19,7 +20,7 @@ User = get_user_model()
 class DashboardView(LoginRequiredMixin, FeatureRequiredMixin, TemplateView):
     template_name = "shifts/dashboard.html"
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -29,7 +30,7 @@ class DashboardView(LoginRequiredMixin, FeatureRequiredMixin, TemplateView):
         if user.is_superuser:
             shifts = Shift.objects.all()
         elif user.groups.filter(name="Agency Managers").exists():
-            shifts = Shift.objects.filter(agency=user.profile.agency)
+            shifts = Shift.objects.filter(agency=get_current_agency(self.request))
         elif user.groups.filter(name="Agency Staff").exists():
             shifts = Shift.objects.filter(shiftassignment__worker=user)
         else:
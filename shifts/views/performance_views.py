@@ -15,6 +15,7 @@ from django.views.generic import (
     UpdateView,
 )
 
+from core.middleware import get_current_agency
 from core.mixins import (
     AgencyManagerRequiredMixin,
     FeatureRequiredMixin,
@@ -42,7 +43,7 @@ class StaffPerformanceListView(
     Only accessible to agency managers and superusers.
     """
 
-    required_features = ["performance_management"]
+    required_features = frozenset({"performance_management"})
     model = StaffPerformance
     template_name = "shifts/staff_performance_list.html"
     context_object_name = "staff_performances"
@@ -53,7 +54,7 @@ class StaffPerformanceListView(
         if user.is_superuser:
             queryset = StaffPerformance.objects.all()
         else:
-            agency = user.profile.agency
+            agency = get_current_agency(self.request)
             queryset = StaffPerformance.objects.filter(agency=agency)
 
         return queryset.order_by("-created_at")
@@ -70,7 +71,7 @@ class StaffPerformanceDetailView(
     Displays detailed performance metrics for a specific staff member.
     """
 
-    required_features = ["performance_management"]
+    required_features = frozenset({"performance_management"})
     model = StaffPerformance
     template_name = "shifts/staff_performance_detail.html"
     context_object_name = "staff_performance"
@@ -80,7 +81,7 @@ class StaffPerformanceDetailView(
         if user.is_superuser:
             queryset = StaffPerformance.objects.all()
         else:
-            agency = user.profile.agency
+            agency = get_current_agency(self.request)
             queryset = StaffPerformance.objects.filter(agency=agency)
 
         return queryset
@@ -97,7 +98,7 @@ class StaffPerformanceCreateView(
     Allows agency managers and superusers to create a new staff performance record.
     """
 
-    required_features = ["performance_management"]
+    required_features = frozenset({"performance_management"})
     model = StaffPerformance
     form_class = StaffPerformanceForm
     template_name = "shifts/staff_performance_form.html"
@@ -130,7 +131,7 @@ class StaffPerformanceUpdateView(
     Allows agency managers and superusers to update an existing staff performance record.
     """
 
-    required_features = ["performance_management"]
+    required_features = frozenset({"performance_management"})
     model = StaffPerformance
     form_class = StaffPerformanceForm
     template_name = "shifts/staff_performance_form.html"
@@ -141,7 +142,7 @@ class StaffPerformanceUpdateView(
         if user.is_superuser:
             queryset = StaffPerformance.objects.all()
         else:
-            agency = user.profile.agency
+            agency = get_current_agency(self.request)
             queryset = StaffPerformance.objects.filter(agency=agency)
 
         return queryset
@@ -166,7 +167,7 @@ class StaffPerformanceDeleteView(
     Allows agency managers and superusers to delete a staff performance record.
     """
 
-    required_features = ["performance_management"]
+    required_features = frozenset({"performance_management"})
     model = StaffPerformance
     template_name = "shifts/staff_performance_confirm_delete.html"
     success_url = reverse_lazy("shifts:staff_performance_list")
@@ -176,7 +177,7 @@ class StaffPerformanceDeleteView(
         if user.is_superuser:
             queryset = StaffPerformance.objects.all()
         else:
-            agency = user.profile.agency
+            agency = get_current_agency(self.request)
             queryset = StaffPerformance.objects.filter(agency=agency)
 
         return queryset
@@ -14,6 +14,7 @@ from django.utils import timezone
 from django.views.generic import TemplateView, View
 
 from accounts.models import Agency
+from core.middleware import get_current_agency
 from core.mixins import (
     AgencyManagerRequiredMixin,
     FeatureRequiredMixin,
@@ -45,7 +46,7 @@ class TimesheetDownloadView(
     Utilizes StreamingHttpResponse for efficient large file handling and robust error handling.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
 
     def get(self, request, *args, **kwargs):
         try:
@@ -191,7 +192,7 @@ class ReportDashboardView(
 ):
     template_name = "shifts/report_dashboard.html"
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -208,7 +209,7 @@ class ReportDashboardView(
                 shift__shift_date__gte=timezone.now().date() - timedelta(days=30)
             )
         else:
-            agency = user.profile.agency
+            agency = get_current_agency(self.request)
             shifts = Shift.objects.filter(shift_date__in=dates, agency=agency)
             performances = StaffPerformance.objects.filter(
                 shift__shift_date__gte=timezone.now().date() - timedelta(days=30),
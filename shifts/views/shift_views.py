@@ -13,6 +13,7 @@ from django.urls import reverse_lazy
 from django.utils import timezone
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 
+from core.middleware import get_current_agency
 from core.mixins import (
     AgencyManagerRequiredMixin,
     AgencyStaffRequiredMixin,
@@ -46,7 +47,7 @@ class ShiftListView(
     Accessible to agency staff, agency managers, and superusers.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
     model = Shift
     template_name = "shifts/shift_list.html"
     context_object_name = "shifts"
@@ -58,7 +59,7 @@ class ShiftListView(
         queryset = Shift.objects.all()
 
         if not user.is_superuser:
-            agency = user.profile.agency
+            agency = get_current_agency(self.request)
             queryset = queryset.filter(agency=agency)
 
         # Annotate with number of assignments and is_full_shift
@@ -116,6 +117,13 @@ class ShiftListView(
         assignments = ShiftAssignment.objects.filter(shift=OuterRef("pk"), worker=user)
         queryset = queryset.annotate(is_assigned=Exists(assignments))
 
+        # Annotate with the distance from the user's registered address
+        profile = getattr(user, "profile", None)
+        if profile and profile.latitude and profile.longitude:
+            queryset = queryset.with_distance(
+                profile.latitude, profile.longitude, unit="miles"
+            )
+
         return queryset
 
     def get_context_data(self, **kwargs):
@@ -149,7 +157,7 @@ class ShiftDetailView(
     Accessible to agency staff, agency owners/managers, and superusers.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
     model = Shift
     template_name = "shifts/shift_detail.html"
     context_object_name = "shift"
@@ -168,7 +176,7 @@ class ShiftDetailView(
             queryset = queryset.filter(is_active=True)
             logger.debug("User is superuser. Filtering active shifts.")
         elif user.groups.filter(name="Agency Owners").exists():
-            agency = user.profile.agency
+            agency = get_current_agency(self.request)
             if agency:
                 queryset = queryset.filter(agency=agency, is_active=True)
                 logger.debug(
@@ -180,7 +188,7 @@ class ShiftDetailView(
                     f"Agency Owner {user.username} does not have an associated agency."
                 )
         elif user.groups.filter(name="Agency Managers").exists():
-            agency = user.profile.agency
+            agency = get_current_agency(self.request)
             if agency:
                 queryset = queryset.filter(agency=agency, is_active=True)
                 logger.debug(
@@ -192,7 +200,7 @@ class ShiftDetailView(
                     f"Agency Manager {user.username} does not have an associated agency."
                 )
         elif user.groups.filter(name="Agency Staff").exists():
-            agency = user.profile.agency
+            agency = get_current_agency(self.request)
             if agency:
                 queryset = queryset.filter(agency=agency, is_active=True)
                 logger.debug(
@@ -331,7 +339,7 @@ class ShiftCreateView(
     Superusers can assign shifts to any agency.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
     model = Shift
     form_class = ShiftForm
     template_name = "shifts/shift_form.html"
@@ -370,7 +378,7 @@ class ShiftCreateView(
             shift.agency = agency
 
             # Check shift limit
-            subscription = agency.subscription
+            subscription = getattr(agency, "subscription", None)
             if subscription and subscription.plan.shift_limit is not None:
                 # Count shifts created this month
                 current_time = timezone.now()
@@ -423,7 +431,7 @@ class ShiftUpdateView(
     Superusers can change the agency of a shift.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
     model = Shift
     form_class = ShiftForm
     template_name = "shifts/shift_form.html"
@@ -487,7 +495,7 @@ class ShiftDeleteView(
     Superusers can deactivate any shift regardless of agency association.
     """
 
-    required_features = ["shift_management"]
+    required_features = frozenset({"shift_management"})
     model = Shift
     template_name = "shifts/shift_confirm_delete.html"
     success_url = reverse_lazy("shifts:shift_list")
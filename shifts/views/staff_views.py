@@ -37,7 +37,7 @@ class StaffListView(
     Only accessible to users with 'custom_integrations' feature.
     """
 
-    required_features = ["custom_integrations"]
+    required_features = frozenset({"custom_integrations"})
     model = User
     template_name = "shifts/staff_list.html"
     context_object_name = "staff_members"
@@ -131,7 +131,7 @@ class StaffCreateView(
     Superusers can add staff to any agency.
     """
 
-    required_features = ["custom_integrations"]
+    required_features = frozenset({"custom_integrations"})
     model = User
     form_class = StaffCreationForm
     template_name = "shifts/add_staff.html"
@@ -190,7 +190,7 @@ class StaffUpdateView(
     Superusers can edit any staff member regardless of agency association.
     """
 
-    required_features = ["custom_integrations"]
+    required_features = frozenset({"custom_integrations"})
     model = User
     form_class = StaffUpdateForm
     template_name = "shifts/edit_staff.html"
@@ -231,7 +231,7 @@ class StaffDeleteView(
     Superusers can deactivate any staff member regardless of agency association.
     """
 
-    required_features = ["custom_integrations"]
+    required_features = frozenset({"custom_integrations"})
     model = User
     template_name = "shifts/delete_staff.html"
     success_url = reverse_lazy("shifts:staff_list")
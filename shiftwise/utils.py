@@ -8,9 +8,6 @@ from math import atan2, cos, radians, sin, sqrt
 from django.conf import settings
 from django.core.cache import cache
 
-from geopy.exc import GeocoderServiceError, GeocoderTimedOut
-from geopy.geocoders import GoogleV3
-
 from accounts.models import User
 from shifts.models import ShiftAssignment
 
@@ -97,6 +94,10 @@ def geocode_address(address):
         logger.error("Google Geocoding API key not found in settings.")
         raise ValueError("Google Geocoding API key not configured.")
 
+    # Imported lazily so processes that never geocode do not load geopy
+    from geopy.exc import GeocoderServiceError, GeocoderTimedOut
+    from geopy.geocoders import GoogleV3
+
     try:
         geolocator = GoogleV3(api_key=settings.GOOGLE_PLACES_API_KEY)
         location = geolocator.geocode(address, timeout=10)
@@ -164,6 +165,9 @@ def get_address_from_address_line1(address_line1):
         logger.debug(f"Cache hit for address_line1: {address_line1}")
         return cached_data
 
+    from geopy.exc import GeocoderServiceError, GeocoderTimedOut
+    from geopy.geocoders import GoogleV3
+
     try:
         geolocator = GoogleV3(api_key=settings.GOOGLE_PLACES_API_KEY)
         location = geolocator.geocode(address_line1, timeout=10)
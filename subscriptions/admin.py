@@ -55,6 +55,7 @@ class SubscriptionAdmin(admin.ModelAdmin):
     list_filter = ("is_active", "is_expired", "plan__name")
     search_fields = ("agency__name", "plan__name", "stripe_subscription_id")
     ordering = ("-current_period_start",)
+    autocomplete_fields = ("agency", "plan")
     readonly_fields = ("created_at", "updated_at")
 
     fieldsets = (
@@ -0,0 +1,132 @@
+# /workspace/shiftwise/subscriptions/cache.py
+
+import logging
+import threading
+import time
+from zlib import crc32
+
+import stripe
+from django.core.cache import cache
+
+from .utils import get_listed_plans, group_plans_by_name
+
+logger = logging.getLogger(__name__)
+
+# Striped locks so concurrent portal requests for one customer wait for a
+# single Stripe call, without keeping a lock per customer alive
+_BILLING_PORTAL_LOCKS = [threading.Lock() for _ in range(16)]
+
+SUBSCRIPTION_CACHE_TIMEOUT = 60 * 5  # 5 minutes
+AVAILABLE_PLANS_CACHE_TIMEOUT = 60  # Bounds staleness in workers the signal misses
+BILLING_PORTAL_CACHE_TIMEOUT = 30  # Long enough to absorb double clicks
+AVAILABLE_PLANS_CACHE_KEY = "available_plans_v2"
+
+
+def subscription_cache_key(subscription_id):
+    return f"stripe_sub:{subscription_id}"
+
+
+def get_or_fetch_subscription(subscription_id):
+    """
+    Returns the Stripe subscription, fetching it from Stripe on a cache miss.
+    Stripe errors propagate to the caller.
+
+    The default cache is per process, so invalidation only reaches the worker
+    that made the change; use this for display only and retrieve the
+    subscription from Stripe before modifying it.
+    """
+    key = subscription_cache_key(subscription_id)
+    subscription = cache.get(key)
+    if subscription is None:
+        subscription = stripe.Subscription.retrieve(subscription_id)
+        cache.set(key, subscription, timeout=SUBSCRIPTION_CACHE_TIMEOUT)
+        logger.debug("Cached Stripe subscription %s", subscription_id)
+    return subscription
+
+
+def customer_subscriptions_cache_key(customer_id):
+    return f"stripe_sub_list:{customer_id}"
+
+
+def get_or_fetch_customer_subscriptions(customer_id):
+    """
+    Returns the customer's most recent Stripe subscriptions, fetching them
+    from Stripe on a cache miss. Stripe errors propagate to the caller.
+    """
+    key = customer_subscriptions_cache_key(customer_id)
+    subscriptions = cache.get(key)
+    if subscriptions is None:
+        subscriptions = stripe.Subscription.list(customer=customer_id, limit=10)
+        cache.set(key, subscriptions, timeout=SUBSCRIPTION_CACHE_TIMEOUT)
+        logger.debug("Cached Stripe subscriptions for customer %s", customer_id)
+    return subscriptions
+
+
+def invalidate_stripe_cache(subscription_id, customer_id=None):
+    """
+    Drops the cached Stripe subscription, and the customer's subscription
+    list if a customer is given, after it changes, e.g. on webhook events.
+    """
+    keys = [subscription_cache_key(subscription_id)]
+    if customer_id:
+        keys.append(customer_subscriptions_cache_key(customer_id))
+    cache.delete_many(keys)
+
+
+def get_available_plans():
+    """
+    Returns the active plans grouped by name for the plan listings.
+
+    Invalidation on plan save or delete (see signals.py) is best-effort: it
+    only clears the cache of the process that made the change, so other
+    workers may show the old listing for up to AVAILABLE_PLANS_CACHE_TIMEOUT.
+    """
+    return cache.get_or_set(
+        AVAILABLE_PLANS_CACHE_KEY,
+        lambda: group_plans_by_name(get_listed_plans()),
+        timeout=AVAILABLE_PLANS_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_available_plans():
+    """
+    Drops the cached plan listing after a plan changes.
+    """
+    cache.delete(AVAILABLE_PLANS_CACHE_KEY)
+
+
+def get_or_create_billing_portal_url(customer_id, return_url):
+    """
+    Returns a Billing Portal URL for the customer, reusing a session created
+    in the last few seconds for the same return URL so duplicate clicks cost
+    one Stripe call. Stripe errors propagate to the caller.
+
+    The cache and lock only dedupe within one process; clicks landing on
+    other workers are deduped by Stripe through the idempotency key.
+    """
+    return_url_hash = f"{crc32(return_url.encode()):08x}"
+    key = f"stripe_portal:{customer_id}:{return_url_hash}"
+    url = cache.get(key)
+    if url is not None:
+        return url
+    lock = _BILLING_PORTAL_LOCKS[
+        crc32(customer_id.encode()) % len(_BILLING_PORTAL_LOCKS)
+    ]
+    with lock:
+        # Another thread may have created the session while we waited
+        url = cache.get(key)
+        if url is None:
+            # Requests retried within the same window, including from other
+            # processes, get the same session back from Stripe. Stripe rejects
+            # reused keys with different parameters, so the return URL is part
+            # of the key
+            window = int(time.time() // BILLING_PORTAL_CACHE_TIMEOUT)
+            session = stripe.billing_portal.Session.create(
+                customer=customer_id,
+                return_url=return_url,
+                idempotency_key=f"bp-{customer_id}-{return_url_hash}-{window}",
+            )
+            url = session.url
+            cache.set(key, url, timeout=BILLING_PORTAL_CACHE_TIMEOUT)
+    # The outcome is logged once by the caller, which knows the request
+    return url
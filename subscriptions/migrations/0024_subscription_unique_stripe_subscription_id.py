@@ -0,0 +1,26 @@
+# Generated by Django 5.1.2 on 2026-10-14 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0024_agency_name_trgm"),
+        ("subscriptions", "0023_subscription_unique_active_subscription_per_agency"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="subscription",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("stripe_subscription_id__isnull", False),
+                    models.Q(("stripe_subscription_id", ""), _negated=True),
+                ),
+                fields=("stripe_subscription_id",),
+                name="unique_stripe_subscription_id",
+                violation_error_message="Stripe Subscription ID must be unique.",
+            ),
+        ),
+    ]
@@ -3,6 +3,7 @@
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import Now
 from django.utils import timezone
 
 
@@ -26,6 +27,16 @@ class Plan(models.Model):
         ("yearly", "Yearly"),
     ]
 
+    # Boolean feature flag fields that subscriptions can be gated on
+    FEATURE_FIELDS = (
+        "notifications_enabled",
+        "advanced_reporting",
+        "priority_support",
+        "shift_management",
+        "staff_performance",
+        "custom_integrations",
+    )
+
     name = models.CharField(
         max_length=100,
         choices=PLAN_CHOICES,
@@ -140,6 +151,18 @@ class Plan(models.Model):
         super().save(*args, **kwargs)
 
 
+class SubscriptionQuerySet(models.QuerySet):
+    """
+    QuerySet with subscription state filters evaluated in the database.
+    """
+
+    def active(self):
+        """
+        Subscriptions that are active and whose current period has not ended.
+        """
+        return self.filter(is_active=True, current_period_end__gt=Now())
+
+
 class Subscription(models.Model):
     """
     Represents an agency's subscription.
@@ -204,6 +227,8 @@ class Subscription(models.Model):
         help_text="Indicates whether the subscription has expired.",
     )
 
+    objects = SubscriptionQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Subscription"
         verbose_name_plural = "Subscriptions"
@@ -213,7 +238,16 @@ class Subscription(models.Model):
                 fields=["agency"],
                 condition=models.Q(is_active=True),
                 name="unique_active_subscription_per_agency",
-            )
+            ),
+            # Enforced by the database, so writes that skip full_clean(), such
+            # as the webhook upserts, are covered too
+            models.UniqueConstraint(
+                fields=["stripe_subscription_id"],
+                condition=models.Q(stripe_subscription_id__isnull=False)
+                & ~models.Q(stripe_subscription_id=""),
+                name="unique_stripe_subscription_id",
+                violation_error_message="Stripe Subscription ID must be unique.",
+            ),
         ]
 
     def __str__(self):
@@ -252,23 +286,43 @@ class Subscription(models.Model):
     def clean(self):
         """
         Custom validation to ensure subscription aligns with plan's constraints.
-        Enforce uniqueness of stripe_subscription_id when it's not null.
+        Uniqueness of stripe_subscription_id is enforced by the
+        unique_stripe_subscription_id constraint.
         """
         if not self.plan:
             raise ValidationError("Subscription must be associated with a Plan.")
         if not self.agency:
             raise ValidationError("Subscription must be associated with an Agency.")
-        # Enforce that stripe_subscription_id is unique when provided
-        if self.stripe_subscription_id:
-            if (
-                Subscription.objects.filter(
-                    stripe_subscription_id=self.stripe_subscription_id
-                )
-                .exclude(pk=self.pk)
-                .exists()
-            ):
-                raise ValidationError("Stripe Subscription ID must be unique.")
         super().clean()
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
+
+
+class WebhookEvent(models.Model):
+    """
+    Records a Stripe webhook event claimed for processing, so redelivered
+    events are skipped by every worker.
+    """
+
+    event_id = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="Stripe Event ID.",
+    )
+    event_type = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Stripe event type, e.g. invoice.payment_succeeded.",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Timestamp when the event was first received.",
+    )
+
+    class Meta:
+        verbose_name = "Webhook Event"
+        verbose_name_plural = "Webhook Events"
+
+    def __str__(self):
+        return f"{self.event_type} ({self.event_id})"
@@ -1,10 +1,14 @@
 # /workspace/shiftwise/subscriptions/services.py
 
+import logging
+
 from django.utils import timezone
 
 from shifts.models import Shift
 from subscriptions.models import Subscription
 
+logger = logging.getLogger(__name__)
+
 
 class SubscriptionLimitChecker:
     @staticmethod
@@ -13,26 +17,31 @@ class SubscriptionLimitChecker:
         Checks if the agency has reached its shift limit based on the current subscription plan.
         Returns True if within limits, False otherwise.
         """
-        try:
-            subscription = Subscription.objects.get(
-                agency=agency, is_active=True, current_period_end__gt=timezone.now()
-            )
-            plan = subscription.plan
-            if not plan:
-                return False
-
-            # Get the first day of the current month
-            first_day_of_month = timezone.now().replace(
-                day=1, hour=0, minute=0, second=0, microsecond=0
-            )
-
-            shift_count = Shift.objects.filter(
-                agency=agency, created_at__gte=first_day_of_month
-            ).count()
-            if plan.shift_management:
-                if plan.shift_limit:
-                    if shift_count >= plan.shift_limit:
-                        return False
-            return True
-        except Subscription.DoesNotExist:
+        subscription = (
+            Subscription.objects.active()
+            .select_related("plan")
+            .filter(agency=agency)
+            .first()
+        )
+        if subscription is None:
+            # An expected miss for unsubscribed agencies, not an error
+            logger.info("No active subscription for agency %s.", agency.pk)
+            return False
+
+        plan = subscription.plan
+        if not plan:
             return False
+
+        # Get the first day of the current month
+        first_day_of_month = timezone.now().replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+
+        shift_count = Shift.objects.filter(
+            agency=agency, created_at__gte=first_day_of_month
+        ).count()
+        if plan.shift_management:
+            if plan.shift_limit:
+                if shift_count >= plan.shift_limit:
+                    return False
+        return True
@@ -3,10 +3,12 @@
 import logging
 
 from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from accounts.models import Agency
+from subscriptions.cache import invalidate_available_plans
+from subscriptions.models import Plan
 from subscriptions.utils import create_stripe_customer
 
 logger = logging.getLogger(__name__)
@@ -29,3 +31,9 @@ def handle_agency_creation(sender, instance, created, **kwargs):
                     f"Failed to create Stripe customer for Agency {instance.name}: {e}"
                 )
                 raise  # Re-raise to rollback the transaction
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def clear_plan_cache(sender, **kwargs):
+    invalidate_available_plans()
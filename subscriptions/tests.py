@@ -1,13 +1,36 @@
 # /workspace/shiftwise/subscriptions/tests.py
 
+import json
+from unittest.mock import MagicMock, patch
+
+import stripe
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group, User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import timezone
 
 from accounts.models import Agency, Profile
 from shifts.models import Shift
-from subscriptions.models import Plan, Subscription
+from subscriptions.cache import (
+    get_available_plans,
+    get_or_create_billing_portal_url,
+    get_or_fetch_customer_subscriptions,
+    get_or_fetch_subscription,
+    invalidate_stripe_cache,
+    subscription_cache_key,
+)
+from subscriptions.models import Plan, Subscription, WebhookEvent
+from subscriptions.utils import (
+    cancel_stripe_subscriptions,
+    get_plan_by_price_id,
+    group_plans_by_name,
+)
+from subscriptions.views import StripeWebhookView
 
 
 class UsageLimitTestCase(TestCase):
@@ -106,3 +129,601 @@ class UsageLimitTestCase(TestCase):
 
         # Check if 'needs_upgrade' is False
         self.assertFalse(response.context["needs_upgrade"])
+
+
+class PlanGroupingTestCase(TestCase):
+    def test_group_plans_by_name_pairs_billing_cycles(self):
+        plans = [
+            Plan(name="Basic", billing_cycle="monthly", description="Basic monthly"),
+            Plan(name="Basic", billing_cycle="yearly", description="Basic yearly"),
+            Plan(name="Pro", billing_cycle="yearly", description="Pro yearly"),
+        ]
+
+        grouped = group_plans_by_name(plans)
+
+        self.assertEqual([group.name for group in grouped], ["Basic", "Pro"])
+        self.assertIs(grouped[0].monthly_plan, plans[0])
+        self.assertIs(grouped[0].yearly_plan, plans[1])
+        self.assertEqual(grouped[0].description, "Basic monthly")
+        self.assertIsNone(grouped[1].monthly_plan)
+        self.assertEqual(grouped[1].description, "Pro yearly")
+
+
+class StripeCacheTestCase(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    @patch("subscriptions.cache.stripe.Subscription.retrieve")
+    def test_subscription_is_fetched_once_until_invalidated(self, retrieve):
+        retrieve.return_value = {"id": "sub_123", "status": "active"}
+
+        get_or_fetch_subscription("sub_123")
+        get_or_fetch_subscription("sub_123")
+        self.assertEqual(retrieve.call_count, 1)
+
+        invalidate_stripe_cache("sub_123")
+        get_or_fetch_subscription("sub_123")
+        self.assertEqual(retrieve.call_count, 2)
+
+    @patch("subscriptions.cache.stripe.Subscription.list")
+    def test_customer_subscriptions_are_fetched_once_until_invalidated(self, list_):
+        list_.return_value = {"data": [{"id": "sub_123"}]}
+
+        get_or_fetch_customer_subscriptions("cus_123")
+        get_or_fetch_customer_subscriptions("cus_123")
+        list_.assert_called_once_with(customer="cus_123", limit=10)
+
+        invalidate_stripe_cache("sub_123")
+        get_or_fetch_customer_subscriptions("cus_123")
+        self.assertEqual(list_.call_count, 1)
+
+        invalidate_stripe_cache("sub_123", "cus_123")
+        get_or_fetch_customer_subscriptions("cus_123")
+        self.assertEqual(list_.call_count, 2)
+
+    @patch("subscriptions.cache.stripe.billing_portal.Session.create")
+    def test_billing_portal_session_reused_for_duplicate_requests(self, create):
+        create.return_value.url = "https://billing.stripe.com/session/1"
+
+        urls = {
+            get_or_create_billing_portal_url("cus_123", "https://example.com/")
+            for _ in range(2)
+        }
+
+        self.assertEqual(urls, {"https://billing.stripe.com/session/1"})
+        create.assert_called_once()
+        self.assertEqual(create.call_args.kwargs["customer"], "cus_123")
+        self.assertTrue(
+            create.call_args.kwargs["idempotency_key"].startswith("bp-cus_123-")
+        )
+
+    @patch("subscriptions.cache.stripe.billing_portal.Session.create")
+    def test_billing_portal_session_not_shared_across_return_urls(self, create):
+        create.side_effect = [
+            MagicMock(url="https://billing.stripe.com/session/1"),
+            MagicMock(url="https://billing.stripe.com/session/2"),
+        ]
+
+        first = get_or_create_billing_portal_url("cus_123", "https://example.com/")
+        second = get_or_create_billing_portal_url("cus_123", "http://example.com/")
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(create.call_count, 2)
+        self.assertEqual(create.call_args.kwargs["return_url"], "http://example.com/")
+
+
+class CancelStripeSubscriptionsTestCase(TestCase):
+    @patch("subscriptions.utils.stripe.Subscription.delete")
+    def test_failed_cancellations_are_reported_separately(self, delete):
+        def fake_delete(subscription_id):
+            if subscription_id == "sub_bad":
+                raise stripe.error.InvalidRequestError("No such subscription", None)
+
+        delete.side_effect = fake_delete
+
+        canceled_ids, failed_ids = cancel_stripe_subscriptions(
+            ["sub_1", "sub_bad", "sub_2"]
+        )
+
+        self.assertEqual(canceled_ids, ["sub_1", "sub_2"])
+        self.assertEqual(failed_ids, ["sub_bad"])
+
+
+class StripeWebhookTestCase(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    @patch("subscriptions.views.StripeWebhookView.handle_subscription_deleted")
+    @patch("subscriptions.views.stripe.WebhookSignature.verify_header")
+    def test_redelivered_event_is_processed_once(self, verify_header, handler):
+        payload = json.dumps(
+            {
+                "id": "evt_123",
+                "object": "event",
+                "type": "customer.subscription.deleted",
+                "data": {"object": {"id": "sub_123", "object": "subscription"}},
+            }
+        )
+
+        for _ in range(2):
+            response = self.client.post(
+                reverse("subscriptions:stripe_webhook"),
+                data=payload,
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="sig",
+            )
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(verify_header.call_count, 2)
+        handler.assert_called_once()
+        self.assertEqual(handler.call_args.args[0]["id"], "sub_123")
+
+    @patch("subscriptions.views.StripeWebhookView.handle_subscription_deleted")
+    @patch("subscriptions.views.stripe.WebhookSignature.verify_header")
+    def test_redelivery_is_skipped_without_the_cache(self, verify_header, handler):
+        payload = json.dumps(
+            {
+                "id": "evt_123",
+                "object": "event",
+                "type": "customer.subscription.deleted",
+                "data": {"object": {"id": "sub_123", "object": "subscription"}},
+            }
+        )
+
+        for _ in range(2):
+            # Another worker, or a restart, starts from an empty local cache
+            cache.clear()
+            self.client.post(
+                reverse("subscriptions:stripe_webhook"),
+                data=payload,
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="sig",
+            )
+
+        handler.assert_called_once()
+        self.assertTrue(WebhookEvent.objects.filter(event_id="evt_123").exists())
+
+    @patch("subscriptions.views.StripeWebhookView.handle_subscription_deleted")
+    @patch("subscriptions.views.stripe.WebhookSignature.verify_header")
+    def test_failed_event_is_released_for_retry(self, verify_header, handler):
+        payload = json.dumps(
+            {
+                "id": "evt_123",
+                "object": "event",
+                "type": "customer.subscription.deleted",
+                "data": {"object": {"id": "sub_123", "object": "subscription"}},
+            }
+        )
+        handler.side_effect = RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            self.client.post(
+                reverse("subscriptions:stripe_webhook"),
+                data=payload,
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="sig",
+            )
+
+        self.assertFalse(WebhookEvent.objects.filter(event_id="evt_123").exists())
+
+    @patch("subscriptions.views.stripe.checkout.Session.retrieve")
+    @patch("subscriptions.views.stripe.Subscription.retrieve")
+    def test_checkout_completed_uses_expanded_subscription(
+        self, subscription_retrieve, session_retrieve
+    ):
+        with patch("subscriptions.signals.create_stripe_customer") as create_customer:
+            create_customer.return_value.id = "cus_1"
+            agency = Agency.objects.create(
+                name="Test Agency", email="agency@example.com"
+            )
+        plan = Plan.objects.create(
+            name="Basic",
+            billing_cycle="monthly",
+            description="Basic Plan",
+            stripe_price_id="price_basic_monthly",
+            price=29.00,
+        )
+        now = int(timezone.now().timestamp())
+        session_retrieve.return_value = {
+            "id": "cs_1",
+            "subscription": {
+                "id": "sub_1",
+                "status": "active",
+                "items": {"data": [{"price": {"id": "price_basic_monthly"}}]},
+                "current_period_start": now,
+                "current_period_end": now + 30 * 24 * 60 * 60,
+            },
+        }
+        StripeWebhookView().handle_checkout_session_completed(
+            {"id": "cs_1", "customer": "cus_1", "subscription": "sub_1"}
+        )
+
+        session_retrieve.assert_called_once_with("cs_1", expand=["subscription"])
+        subscription_retrieve.assert_not_called()
+        subscription = Subscription.objects.get(agency=agency)
+        self.assertEqual(subscription.plan, plan)
+        self.assertEqual(subscription.stripe_subscription_id, "sub_1")
+        self.assertTrue(subscription.is_active)
+
+    def test_checkout_completed_updates_existing_subscription(self):
+        with patch("subscriptions.signals.create_stripe_customer") as create_customer:
+            create_customer.return_value.id = "cus_1"
+            agency = Agency.objects.create(
+                name="Test Agency", email="agency@example.com"
+            )
+        old_plan, new_plan = [
+            Plan.objects.create(
+                name=name,
+                billing_cycle="monthly",
+                description=f"{name} Plan",
+                stripe_price_id=price_id,
+                price=price,
+            )
+            for name, price_id, price in [
+                ("Basic", "price_basic_monthly", 29.00),
+                ("Pro", "price_pro_monthly", 49.00),
+            ]
+        ]
+        existing = Subscription.objects.create(
+            agency=agency,
+            plan=old_plan,
+            stripe_subscription_id="sub_old",
+            is_active=False,
+            status="canceled",
+            current_period_end=timezone.now(),
+        )
+        now = int(timezone.now().timestamp())
+        StripeWebhookView().handle_checkout_session_completed(
+            {
+                "id": "cs_1",
+                "customer": "cus_1",
+                "subscription": {
+                    "id": "sub_new",
+                    "status": "active",
+                    "items": {"data": [{"price": {"id": "price_pro_monthly"}}]},
+                    "current_period_start": now,
+                    "current_period_end": now + 30 * 24 * 60 * 60,
+                },
+            }
+        )
+
+        existing.refresh_from_db()
+        self.assertEqual(Subscription.objects.count(), 1)
+        self.assertEqual(existing.plan, new_plan)
+        self.assertEqual(existing.stripe_subscription_id, "sub_new")
+        self.assertEqual(existing.status, "active")
+        self.assertTrue(existing.is_active)
+
+    def test_subscription_deleted_only_writes_changed_columns(self):
+        with patch("subscriptions.signals.create_stripe_customer") as create_customer:
+            create_customer.return_value.id = "cus_1"
+            agency = Agency.objects.create(
+                name="Test Agency", email="agency@example.com"
+            )
+        plan = Plan.objects.create(
+            name="Basic",
+            billing_cycle="monthly",
+            description="Basic Plan",
+            stripe_price_id="price_basic_monthly",
+            price=29.00,
+        )
+        subscription = Subscription.objects.create(
+            agency=agency,
+            plan=plan,
+            stripe_subscription_id="sub_1",
+            is_active=True,
+            status="active",
+            current_period_end=timezone.now(),
+        )
+
+        with patch.object(Subscription, "save", autospec=True) as save:
+            StripeWebhookView().handle_subscription_deleted({"id": "sub_1"})
+        save.assert_called_once()
+        self.assertEqual(
+            save.call_args.kwargs["update_fields"],
+            ["is_active", "status", "updated_at"],
+        )
+
+        StripeWebhookView().handle_subscription_deleted({"id": "sub_1"})
+        subscription.refresh_from_db()
+        self.assertFalse(subscription.is_active)
+        self.assertEqual(subscription.status, "canceled")
+
+    def test_subscription_created_replaces_canceled_subscription(self):
+        with patch("subscriptions.signals.create_stripe_customer") as create_customer:
+            create_customer.return_value.id = "cus_1"
+            agency = Agency.objects.create(
+                name="Test Agency", email="agency@example.com"
+            )
+        plan = Plan.objects.create(
+            name="Basic",
+            billing_cycle="monthly",
+            description="Basic Plan",
+            stripe_price_id="price_basic_monthly",
+            price=29.00,
+        )
+        Subscription.objects.create(
+            agency=agency,
+            plan=plan,
+            stripe_subscription_id="sub_old",
+            is_active=False,
+            status="canceled",
+            current_period_end=timezone.now(),
+        )
+        now = int(timezone.now().timestamp())
+        StripeWebhookView().handle_subscription_created(
+            {
+                "id": "sub_new",
+                "customer": "cus_1",
+                "status": "active",
+                "items": {"data": [{"price": {"id": "price_basic_monthly"}}]},
+                "current_period_start": now,
+                "current_period_end": now + 30 * 24 * 60 * 60,
+            }
+        )
+
+        subscription = Subscription.objects.get(agency=agency)
+        self.assertEqual(subscription.stripe_subscription_id, "sub_new")
+        self.assertTrue(subscription.is_active)
+
+
+class SubscriptionQuerySetTestCase(TestCase):
+    def setUp(self):
+        with patch("subscriptions.signals.create_stripe_customer") as create_customer:
+            create_customer.return_value.id = "cus_1"
+            self.agency = Agency.objects.create(
+                name="Test Agency", email="agency@example.com"
+            )
+        self.plan = Plan.objects.create(
+            name="Basic",
+            billing_cycle="monthly",
+            description="Basic Plan",
+            stripe_price_id="price_basic_monthly",
+            price=29.00,
+        )
+        self.subscription = Subscription.objects.create(
+            agency=self.agency,
+            plan=self.plan,
+            is_active=True,
+            current_period_end=timezone.now() + timezone.timedelta(days=30),
+        )
+
+    def test_active_includes_current_subscription(self):
+        self.assertQuerySetEqual(Subscription.objects.active(), [self.subscription])
+
+    def test_active_excludes_expired_subscription(self):
+        self.subscription.current_period_end = timezone.now() - timezone.timedelta(
+            days=1
+        )
+        self.subscription.save()
+        self.assertFalse(Subscription.objects.active().exists())
+
+    def test_active_excludes_inactive_subscription(self):
+        self.subscription.is_active = False
+        self.subscription.save()
+        self.assertFalse(Subscription.objects.active().exists())
+
+
+class PlanLookupCacheTestCase(TestCase):
+    def setUp(self):
+        self.plan = Plan.objects.create(
+            name="Basic",
+            billing_cycle="monthly",
+            description="Basic Plan",
+            stripe_price_id="price_basic_monthly",
+            price=29.00,
+        )
+
+    def test_lookup_sees_changes_made_without_signals(self):
+        self.assertEqual(get_plan_by_price_id("price_basic_monthly"), self.plan)
+        # update() sends no post_save, like a change made by another worker
+        Plan.objects.filter(pk=self.plan.pk).update(is_active=False)
+        self.assertFalse(get_plan_by_price_id("price_basic_monthly").is_active)
+
+    def test_available_plans_cached_until_a_plan_changes(self):
+        cache.clear()
+        self.assertEqual(get_available_plans()[0].name, "Basic")
+        with self.assertNumQueries(0):
+            get_available_plans()
+        self.plan.name = "Renamed"
+        self.plan.save()
+        self.assertEqual(get_available_plans()[0].name, "Renamed")
+
+
+class SubscriptionConstraintTestCase(TestCase):
+    def setUp(self):
+        with patch("subscriptions.signals.create_stripe_customer") as create_customer:
+            create_customer.return_value.id = "cus_1"
+            self.agencies = [
+                Agency.objects.create(name=name, email=f"{name.lower()}@example.com")
+                for name in ("First", "Second")
+            ]
+        self.plan = Plan.objects.create(
+            name="Basic",
+            billing_cycle="monthly",
+            description="Basic Plan",
+            stripe_price_id="price_basic_monthly",
+            price=29.00,
+        )
+
+    def make_subscription(self, agency, stripe_subscription_id):
+        return Subscription(
+            agency=agency,
+            plan=self.plan,
+            stripe_subscription_id=stripe_subscription_id,
+            current_period_end=timezone.now(),
+        )
+
+    def test_duplicate_stripe_subscription_id_rejected_by_database(self):
+        self.make_subscription(self.agencies[0], "sub_1").save()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.make_subscription(self.agencies[1], "sub_1").save()
+
+    def test_duplicate_stripe_subscription_id_fails_validation(self):
+        self.make_subscription(self.agencies[0], "sub_1").save()
+        with self.assertRaisesMessage(
+            ValidationError, "Stripe Subscription ID must be unique."
+        ):
+            self.make_subscription(self.agencies[1], "sub_1").full_clean()
+
+    def test_blank_stripe_subscription_ids_may_repeat(self):
+        self.make_subscription(self.agencies[0], "").save()
+        self.make_subscription(self.agencies[1], "").save()
+        self.assertEqual(Subscription.objects.count(), 2)
+
+
+class SubscriptionChangeViewTestCase(TestCase):
+    def setUp(self):
+        with patch("subscriptions.signals.create_stripe_customer") as create_customer:
+            create_customer.return_value.id = "cus_1"
+            self.agency = Agency.objects.create(
+                name="Test Agency", email="agency@example.com"
+            )
+        self.user = get_user_model().objects.create_user(
+            username="owner", email="owner@example.com", password="pass"
+        )
+        self.user.groups.add(Group.objects.get_or_create(name="Agency Owners")[0])
+        self.user.profile.agency = self.agency
+        self.user.profile.save()
+        basic = Plan.objects.create(
+            name="Basic",
+            billing_cycle="monthly",
+            stripe_price_id="price_basic_monthly",
+            price=29.00,
+        )
+        self.pro = Plan.objects.create(
+            name="Pro",
+            billing_cycle="monthly",
+            stripe_price_id="price_pro_monthly",
+            price=59.00,
+        )
+        self.subscription = Subscription.objects.create(
+            agency=self.agency,
+            plan=basic,
+            is_active=True,
+            stripe_subscription_id="sub_1",
+            current_period_end=timezone.now() + timezone.timedelta(days=30),
+        )
+        self.client.login(username="owner", password="pass")
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch("subscriptions.views.stripe.Subscription.modify")
+    @patch("subscriptions.views.stripe.Subscription.retrieve")
+    def test_upgrade_ignores_stale_cached_status(self, retrieve, modify):
+        # Another worker still caches the subscription as active
+        cache.set(
+            subscription_cache_key("sub_1"),
+            {"status": "active", "items": {"data": []}},
+        )
+        retrieve.return_value = {"status": "past_due"}
+
+        self.client.post(
+            reverse("subscriptions:upgrade_subscription", args=[self.pro.id])
+        )
+
+        retrieve.assert_called_once_with("sub_1")
+        modify.assert_not_called()
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.status, "past_due")
+
+
+class UpdatePaymentMethodViewTestCase(TestCase):
+    def setUp(self):
+        with patch("subscriptions.signals.create_stripe_customer") as create_customer:
+            create_customer.return_value.id = None
+            self.agency = Agency.objects.create(
+                name="Test Agency", email="agency@example.com"
+            )
+        self.user = get_user_model().objects.create_user(
+            username="owner", email="owner@example.com", password="pass"
+        )
+        self.user.groups.add(Group.objects.get_or_create(name="Agency Owners")[0])
+        self.user.profile.agency = self.agency
+        self.user.profile.save()
+        self.client.login(username="owner", password="pass")
+
+    @patch("subscriptions.views.stripe.billing_portal.Session.create")
+    def test_missing_stripe_customer_redirects_without_calling_stripe(
+        self, session_create
+    ):
+        response = self.client.post(reverse("subscriptions:update_payment_method"))
+
+        self.assertRedirects(
+            response,
+            reverse("subscriptions:subscription_home"),
+            fetch_redirect_response=False,
+        )
+        session_create.assert_not_called()
+
+    @patch("subscriptions.views.stripe.billing_portal.Session.create")
+    def test_stripe_outage_is_logged_without_traceback(self, session_create):
+        self.agency.stripe_customer_id = "cus_1"
+        self.agency.save()
+        session_create.side_effect = stripe.error.APIConnectionError("down")
+
+        with self.assertLogs("subscriptions.views", level="ERROR") as logs:
+            response = self.client.post(reverse("subscriptions:update_payment_method"))
+
+        self.assertRedirects(
+            response,
+            reverse("subscriptions:subscription_home"),
+            fetch_redirect_response=False,
+        )
+        self.assertIsNone(logs.records[0].exc_info)
+        self.assertEqual(logs.records[0].agency, "Test Agency")
+        self.assertEqual(logs.records[0].user, "owner")
+        self.assertEqual(logs.records[0].outcome, "stripe_unavailable")
+
+    @patch("subscriptions.views.stripe.billing_portal.Session.create")
+    def test_success_logs_a_single_record(self, session_create):
+        self.agency.stripe_customer_id = "cus_1"
+        self.agency.save()
+        session_create.return_value.url = "https://billing.stripe.com/session"
+
+        with self.assertLogs("subscriptions", level="INFO") as logs:
+            response = self.client.post(reverse("subscriptions:update_payment_method"))
+
+        self.assertRedirects(
+            response,
+            "https://billing.stripe.com/session",
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].outcome, "ok")
+        self.assertEqual(logs.records[0].customer, "cus_1")
+
+    @patch("subscriptions.views.stripe.billing_portal.Session.create")
+    def test_stripe_error_returns_json_to_api_clients(self, session_create):
+        self.agency.stripe_customer_id = "cus_1"
+        self.agency.save()
+        session_create.side_effect = stripe.error.APIConnectionError("down")
+
+        with self.assertLogs("subscriptions.views", level="ERROR"):
+            response = self.client.post(
+                reverse("subscriptions:update_payment_method"),
+                HTTP_ACCEPT="application/json",
+            )
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(
+            response.json(), {"error": "Unable to redirect to Billing Portal."}
+        )
+        self.assertEqual(list(get_messages(response.wsgi_request)), [])
+        self.assertNotIn("messages", response.cookies)
+
+    @patch("subscriptions.views.stripe.billing_portal.Session.create")
+    def test_missing_stripe_customer_returns_json_to_api_clients(self, session_create):
+        with self.assertLogs("subscriptions.utils", level="ERROR"):
+            response = self.client.post(
+                reverse("subscriptions:update_payment_method"),
+                HTTP_ACCEPT="application/json",
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {"error": "Unable to redirect to Billing Portal."}
+        )
+        self.assertEqual(list(get_messages(response.wsgi_request)), [])
+        session_create.assert_not_called()
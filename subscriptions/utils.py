@@ -1,15 +1,53 @@
 # /workspace/shiftwise/subscriptions/utils.py
 
 import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
 
 import stripe
 from django.conf import settings
+from django.contrib import messages
+from django.db import IntegrityError, transaction
+from django.http import HttpResponseRedirect
+from django.urls import reverse
+
+from core.middleware import get_permission_context
+from subscriptions.models import Plan, WebhookEvent
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on concurrent Stripe cancellation requests
+CANCEL_MAX_WORKERS = 8
+
+# Stripe timestamps are Unix epochs in UTC
+UTC = timezone.utc
+
 # Initialize Stripe with the secret key from settings
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
+# Share one HTTP client across the process so Stripe calls reuse pooled
+# keep-alive connections (RequestsClient keeps a requests.Session per thread)
+# instead of paying a TLS handshake per request. The timeout bounds how long
+# a slow Stripe response can hold a synchronous worker
+if not isinstance(stripe.default_http_client, stripe.http_client.RequestsClient):
+    stripe.default_http_client = stripe.http_client.RequestsClient(
+        timeout=settings.STRIPE_HTTP_TIMEOUT,
+        verify_ssl_certs=stripe.verify_ssl_certs,
+        proxy=stripe.proxy,
+    )
+
+
+@lru_cache(maxsize=None)
+def subscription_path(name):
+    """
+    Returns the path of a subscriptions URL, reversed once per process.
+    Used for the fixed Stripe return URLs and the error redirects on the
+    checkout and Billing Portal paths.
+    """
+    return reverse(f"subscriptions:{name}")
+
 
 def create_stripe_customer(agency):
     """
@@ -48,3 +86,182 @@ def create_stripe_customer(agency):
     except Exception as e:
         logger.exception(f"Unexpected error while creating Stripe customer: {e}")
         raise
+
+
+# Plan columns read by the plan listing templates
+PLAN_LISTING_FIELDS = (
+    "id",
+    "name",
+    "description",
+    "billing_cycle",
+    "price",
+    "stripe_price_id",
+    "shift_limit",
+) + Plan.FEATURE_FIELDS
+
+
+def from_stripe_timestamp(timestamp):
+    """
+    Converts a Stripe Unix timestamp to an aware UTC datetime.
+    """
+    return datetime.fromtimestamp(timestamp, tz=UTC)
+
+
+def get_listed_plans(queryset=None):
+    """
+    Returns active plans ordered for grouping, loading only the columns the
+    plan listings use.
+    """
+    if queryset is None:
+        queryset = Plan.objects.filter(is_active=True)
+    return queryset.only(*PLAN_LISTING_FIELDS).order_by("name", "billing_cycle")
+
+
+def get_plan_by_price_id(price_id):
+    """
+    Returns the plan for a Stripe price ID with one indexed query. Not
+    memoised: a per-process copy would outlive plan changes made through
+    other workers.
+    Raises Plan.DoesNotExist for unknown price IDs.
+    """
+    return Plan.objects.get(stripe_price_id=price_id)
+
+
+PlanGroup = namedtuple(
+    "PlanGroup", ["name", "description", "monthly_plan", "yearly_plan"]
+)
+
+
+def group_plans_by_name(plans):
+    """
+    Groups plans by name in a single pass.
+
+    Parameters:
+    - plans (iterable of Plan): The plans to group.
+
+    Returns:
+    - list of PlanGroup: One per plan name with its description and its
+      monthly and yearly plans (None when missing).
+    """
+    # name -> [description, monthly_plan, yearly_plan]
+    grouped = {}
+    for plan in plans:
+        billing_cycle = plan.billing_cycle.lower()
+        if billing_cycle == "monthly":
+            row = grouped.setdefault(plan.name, [None, None, None])
+            # The monthly plan's description takes precedence over the yearly one
+            row[0] = plan.description
+            row[1] = plan
+        elif billing_cycle == "yearly":
+            row = grouped.setdefault(plan.name, [None, None, None])
+            if row[0] is None:
+                row[0] = plan.description
+            row[2] = plan
+    return [PlanGroup(name, *row) for name, row in grouped.items()]
+
+
+def get_user_subscription_context(request):
+    """
+    Returns the request user's (profile, agency, subscription), any of which
+    may be None. All three come from the request's PermissionContext, which
+    loads them with their plan in a single joined query.
+    """
+    profile = get_permission_context(request).profile
+    agency = profile.agency if profile else None
+    # A missing reverse one-to-one raises a subclass of AttributeError
+    subscription = getattr(agency, "subscription", None) if agency else None
+    return profile, agency, subscription
+
+
+AgencyContext = namedtuple("AgencyContext", ["profile", "agency", "subscription"])
+
+
+def resolve_agency_context(
+    request, *, require_stripe=False, require_subscription=False, flash=True
+):
+    """
+    Resolves the request user's profile, agency and subscription and checks
+    the requirements shared by the subscription views.
+
+    Returns:
+    - tuple: (AgencyContext, error_redirect). When a requirement is not met
+      the failure has been logged, the user messaged unless flash is False,
+      and error_redirect points back to the subscription home page;
+      otherwise it is None.
+    """
+    user = request.user
+    ctx = AgencyContext(*get_user_subscription_context(request))
+
+    if ctx.profile is None:
+        message = "User profile does not exist. Please contact support."
+        logger.error("Profile does not exist for user: %s", user.username)
+    elif ctx.agency is None:
+        message = "Your agency information is missing. Please contact support."
+        logger.error("Agency is None for user: %s", user.username)
+    elif require_stripe and not ctx.agency.stripe_customer_id:
+        message = "No Stripe customer ID found. Please contact support."
+        logger.error("Stripe customer ID is missing for agency: %s", ctx.agency.name)
+    elif require_subscription and ctx.subscription is None:
+        message = "Active subscription not found. Please subscribe first."
+        logger.error("No active subscription for agency: %s", ctx.agency.name)
+    else:
+        return ctx, None
+
+    if flash:
+        messages.error(request, message)
+    return ctx, HttpResponseRedirect(subscription_path("subscription_home"))
+
+
+def cancel_stripe_subscriptions(subscription_ids):
+    """
+    Cancels the given Stripe subscriptions concurrently.
+
+    Parameters:
+    - subscription_ids (list of str): Stripe Subscription IDs to cancel.
+
+    Returns:
+    - tuple: (canceled_ids, failed_ids)
+    """
+
+    def cancel(subscription_id):
+        try:
+            stripe.Subscription.delete(subscription_id)
+            return subscription_id, True
+        except stripe.error.StripeError as e:
+            logger.exception(
+                f"Stripe error while cancelling subscription {subscription_id}: {e}"
+            )
+            return subscription_id, False
+
+    if not subscription_ids:
+        return [], []
+
+    max_workers = min(CANCEL_MAX_WORKERS, len(subscription_ids))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(cancel, subscription_ids))
+
+    canceled_ids = [subscription_id for subscription_id, ok in results if ok]
+    failed_ids = [subscription_id for subscription_id, ok in results if not ok]
+    return canceled_ids, failed_ids
+
+
+def claim_webhook_event(event_id, event_type=""):
+    """
+    Marks a Stripe webhook event as being processed. Returns False if the
+    event was already claimed, so redelivered events are handled only once.
+    The unique event id is enforced by the database, so this holds across
+    workers and restarts.
+    """
+    try:
+        with transaction.atomic():
+            WebhookEvent.objects.create(event_id=event_id, event_type=event_type)
+    except IntegrityError:
+        return False
+    return True
+
+
+def release_webhook_event(event_id):
+    """
+    Releases a claimed webhook event so a Stripe retry can process it again.
+    """
+    WebhookEvent.objects.filter(event_id=event_id).delete()
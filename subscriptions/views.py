@@ -1,17 +1,15 @@
 # /workspace/shiftwise/subscriptions/views.py
 
 import logging
-from collections import defaultdict
-from datetime import datetime, timezone as datetime_timezone
 
 import stripe
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import ValidationError
-from django.http import HttpResponse
+from django.db import IntegrityError
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views import View
@@ -19,17 +17,36 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import TemplateView
 from django.db.models import Q
 
-from accounts.models import Agency, Profile
+from accounts.models import Agency
+from core.middleware import get_permission_context
 from core.mixins import AgencyOwnerRequiredMixin
 from subscriptions.models import Plan, Subscription
 
-from .utils import create_stripe_customer
+from .cache import (
+    get_available_plans,
+    get_or_create_billing_portal_url,
+    get_or_fetch_customer_subscriptions,
+    get_or_fetch_subscription,
+    invalidate_stripe_cache,
+)
+from .utils import (
+    PLAN_LISTING_FIELDS,
+    cancel_stripe_subscriptions,
+    claim_webhook_event,
+    create_stripe_customer,
+    from_stripe_timestamp,
+    get_plan_by_price_id,
+    get_user_subscription_context,
+    group_plans_by_name,
+    release_webhook_event,
+    resolve_agency_context,
+    subscription_path,
+)
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-# Set Stripe API key
-stripe.api_key = settings.STRIPE_SECRET_KEY
+# The Stripe client (API key, HTTP timeout) is configured once in utils.py
 
 
 class SubscriptionHomeView(LoginRequiredMixin, TemplateView):
@@ -40,91 +57,30 @@ class SubscriptionHomeView(LoginRequiredMixin, TemplateView):
         user = self.request.user
 
         if user.is_authenticated:
-            try:
-                profile = user.profile
-            except Profile.DoesNotExist:
-                messages.error(
-                    self.request, "User profile does not exist. Please contact support."
-                )
-                logger.error(f"Profile does not exist for user: {user.username}")
-                return context
-
-            agency = profile.agency
-
-            if agency is None:
-                messages.error(
-                    self.request,
-                    "Your agency information is missing. Please contact support.",
-                )
-                logger.error(f"Agency is None for user: {user.username}")
+            ctx, error_redirect = resolve_agency_context(self.request)
+            if error_redirect is not None:
                 return context
+            agency, subscription = ctx.agency, ctx.subscription
 
             # Get current subscription
-            try:
-                subscription = agency.subscription
-                if (
-                    subscription.is_active
-                    and subscription.current_period_end
-                    and subscription.current_period_end > timezone.now()
-                ):
-                    context["subscription"] = subscription
-                    context["current_plan"] = subscription.plan
-                    context["has_active_subscription"] = True
-                else:
-                    context["subscription"] = None
-                    context["current_plan"] = None
-                    context["has_active_subscription"] = False
-            except Subscription.DoesNotExist:
-                context["subscription"] = None
-                context["current_plan"] = None
-                context["has_active_subscription"] = False
-                logger.warning(f"No active subscription for agency: {agency.name}")
-            except Exception as e:
-                messages.error(
-                    self.request,
-                    "An error occurred while retrieving your subscription.",
-                )
-                logger.exception(f"Error retrieving subscription: {e}")
+            if (
+                subscription
+                and subscription.is_active
+                and subscription.current_period_end
+                and subscription.current_period_end > timezone.now()
+            ):
+                context["subscription"] = subscription
+                context["current_plan"] = subscription.plan
+                context["has_active_subscription"] = True
+            else:
                 context["subscription"] = None
                 context["current_plan"] = None
                 context["has_active_subscription"] = False
+                if subscription is None:
+                    logger.warning(f"No active subscription for agency: {agency.name}")
 
-            # Retrieve all active plans
-            plans = Plan.objects.filter(is_active=True).order_by(
-                "name", "billing_cycle"
-            )
-
-            # Group plans by name and billing cycle
-            plan_dict = defaultdict(dict)
-            for plan in plans:
-                if plan.billing_cycle.lower() == "monthly":
-                    plan_dict[plan.name]["monthly_plan"] = plan
-                elif plan.billing_cycle.lower() == "yearly":
-                    plan_dict[plan.name]["yearly_plan"] = plan
-
-            # Structure available_plans as a list of dictionaries
-            available_plans = []
-            for plan_name, plans in plan_dict.items():
-                if not plans.get("monthly_plan") and not plans.get("yearly_plan"):
-                    logger.warning(
-                        f"No monthly or yearly plan found for {plan_name}. Skipping."
-                    )
-                    continue
-
-                description = (
-                    plans.get("monthly_plan").description
-                    if plans.get("monthly_plan")
-                    else plans.get("yearly_plan").description
-                )
-
-                available_plans.append(
-                    {
-                        "name": plan_name,
-                        "description": description,
-                        "monthly_plan": plans.get("monthly_plan"),
-                        "yearly_plan": plans.get("yearly_plan"),
-                    }
-                )
+            # Retrieve all active plans grouped by name
+            available_plans = get_available_plans()
 
             context["available_plans"] = available_plans
 
@@ -141,20 +97,18 @@ class SubscribeView(LoginRequiredMixin, View):
     def process_subscription(self, request, plan_id):
         user = request.user
 
-        try:
-            profile = user.profile
-        except Profile.DoesNotExist:
+        profile, agency, subscription = get_user_subscription_context(request)
+        if profile is None:
             messages.error(request, "Please complete your profile before subscribing.")
             logger.error(f"Profile does not exist for user: {user.username}")
             return redirect("accounts:update_profile")
 
-        agency = profile.agency
         if not agency:
             messages.error(request, "Please create an agency before subscribing.")
             logger.error(f"Agency is None for user: {user.username}")
             return redirect("accounts:create_agency")
 
-        if not user.groups.filter(name="Agency Owners").exists():
+        if "Agency Owners" not in get_permission_context(request).group_names:
             messages.error(request, "Only agency owners can subscribe.")
             logger.warning(
                 f"User {user.username} attempted to subscribe without being an agency owner."
@@ -170,21 +124,7 @@ class SubscribeView(LoginRequiredMixin, View):
             logger.error(f"Stripe customer ID is missing for agency: {agency.name}")
             return redirect("subscriptions:subscription_home")
 
-        try:
-            customer = stripe.Customer.retrieve(agency.stripe_customer_id)
-            logger.info(
-                f"Stripe customer retrieved for agency: {agency.name}, Customer ID: {customer.id}"
-            )
-        except stripe.error.StripeError as e:
-            messages.error(request, "Failed to retrieve Stripe customer.")
-            logger.exception(f"Stripe error while retrieving customer: {e}")
-            return redirect("subscriptions:subscription_home")
-        except Exception as e:
-            messages.error(request, "An unexpected error occurred. Please try again.")
-            logger.exception(f"Unexpected error while retrieving customer: {e}")
-            return redirect("subscriptions:subscription_home")
-
-        if hasattr(agency, "subscription") and agency.subscription.is_active:
+        if subscription is not None and subscription.is_active:
             messages.info(
                 request,
                 "You already have an active subscription. Manage your subscription instead.",
@@ -194,7 +134,7 @@ class SubscribeView(LoginRequiredMixin, View):
 
         try:
             checkout_session = stripe.checkout.Session.create(
-                customer=customer.id,
+                customer=agency.stripe_customer_id,
                 payment_method_types=["card"],
                 line_items=[
                     {
@@ -204,10 +144,10 @@ class SubscribeView(LoginRequiredMixin, View):
                 ],
                 mode="subscription",
                 success_url=request.build_absolute_uri(
-                    reverse("subscriptions:subscription_success")
+                    subscription_path("subscription_success")
                 ),
                 cancel_url=request.build_absolute_uri(
-                    reverse("subscriptions:subscription_cancel")
+                    subscription_path("subscription_cancel")
                 ),
             )
             logger.info(
@@ -255,7 +195,27 @@ class StripeWebhookView(View):
             logger.exception(f"Invalid signature: {e}")
             return HttpResponse(status=400)
 
-        # Handle the event
+        # Stripe redelivers events it considers unacknowledged; skip duplicates.
+        # The handlers are idempotent upserts as well, so an event processed
+        # twice (e.g. released after a partial failure) is still safe
+        event_id = event.get("id")
+        if event_id and not claim_webhook_event(event_id, event.get("type", "")):
+            logger.info(f"Duplicate Stripe webhook ignored: {event_id}")
+            return HttpResponse(status=200)
+
+        try:
+            self.process_event(event)
+        except Exception:
+            if event_id:
+                release_webhook_event(event_id)
+            raise
+
+        return HttpResponse(status=200)
+
+    def process_event(self, event):
+        """
+        Dispatches a verified Stripe event to its handler.
+        """
         event_type = event.get("type")
         event_data = event.get("data", {}).get("object", {})
 
@@ -272,8 +232,6 @@ class StripeWebhookView(View):
         else:
             logger.info(f"Unhandled event type: {event_type}")
 
-        return HttpResponse(status=200)
-
     def handle_invoice_paid(self, invoice):
         """
         Handle the invoice.payment_succeeded event.
@@ -293,7 +251,9 @@ class StripeWebhookView(View):
             # Ensure 'last_payment_date' exists in the Subscription model
             if hasattr(local_subscription, "last_payment_date"):
                 local_subscription.last_payment_date = timezone.now()
-                local_subscription.save()
+                local_subscription.save(
+                    update_fields=["last_payment_date", "updated_at"]
+                )
                 logger.info(
                     f"Updated last_payment_date for subscription {stripe_subscription_id}."
                 )
@@ -320,7 +280,10 @@ class StripeWebhookView(View):
             )
             local_subscription.is_active = False
             local_subscription.status = "canceled"
-            local_subscription.save()
+            local_subscription.save(update_fields=["is_active", "status", "updated_at"])
+            invalidate_stripe_cache(
+                stripe_subscription_id, subscription.get("customer")
+            )
             logger.info(f"Subscription {stripe_subscription_id} deactivated.")
         except Subscription.DoesNotExist:
             logger.warning(
@@ -343,13 +306,24 @@ class StripeWebhookView(View):
             )
             current_period_end = subscription.get("current_period_end")
             if current_period_end:
-                local_subscription.current_period_end = datetime.fromtimestamp(
-                    current_period_end, tz=datetime_timezone.utc
+                local_subscription.current_period_end = from_stripe_timestamp(
+                    current_period_end
                 )
             new_plan_id = subscription["items"]["data"][0]["price"]["id"]
-            new_plan = Plan.objects.get(stripe_price_id=new_plan_id)
+            new_plan = get_plan_by_price_id(new_plan_id)
             local_subscription.plan = new_plan
-            local_subscription.save()
+            local_subscription.save(
+                update_fields=[
+                    "is_active",
+                    "status",
+                    "current_period_end",
+                    "plan",
+                    "updated_at",
+                ]
+            )
+            invalidate_stripe_cache(
+                stripe_subscription_id, subscription.get("customer")
+            )
             logger.info(
                 f"Subscription updated to {new_plan.name} for agency: {local_subscription.agency.name}"
             )
@@ -370,57 +344,56 @@ class StripeWebhookView(View):
 
     def handle_checkout_session_completed(self, session):
         customer_id = session.get("customer")
-        subscription_id = session.get("subscription")
+        stripe_subscription = session.get("subscription")
 
         logger.debug(
             f"Processing checkout.session.completed for customer {customer_id}"
         )
 
         try:
-            stripe_subscription = stripe.Subscription.retrieve(subscription_id)
-            logger.debug(f"Retrieved Stripe Subscription: {stripe_subscription}")
+            if isinstance(stripe_subscription, str):
+                # Checkout events only carry the subscription ID, so one Stripe
+                # call is still needed; expanding it on the session returns the
+                # items and period dates the same way a Subscription.retrieve
+                # would
+                stripe_subscription = stripe.checkout.Session.retrieve(
+                    session["id"], expand=["subscription"]
+                )["subscription"]
+                logger.debug(f"Retrieved Stripe Subscription: {stripe_subscription}")
+            subscription_id = stripe_subscription["id"]
 
             plan_id = stripe_subscription["items"]["data"][0]["price"]["id"]
             logger.debug(f"Plan ID from Stripe: {plan_id}")
 
-            current_period_start = datetime.fromtimestamp(
-                stripe_subscription["current_period_start"], tz=datetime_timezone.utc
+            current_period_start = from_stripe_timestamp(
+                stripe_subscription["current_period_start"]
             )
-            current_period_end = datetime.fromtimestamp(
-                stripe_subscription["current_period_end"], tz=datetime_timezone.utc
+            current_period_end = from_stripe_timestamp(
+                stripe_subscription["current_period_end"]
             )
 
             agency = Agency.objects.get(stripe_customer_id=customer_id)
             logger.debug(f"Found Agency: {agency.name}")
 
-            plan = Plan.objects.get(stripe_price_id=plan_id)
+            plan = get_plan_by_price_id(plan_id)
             logger.debug(f"Found Plan: {plan.name}")
 
-            try:
-                subscription = agency.subscription
-                logger.debug(f"Existing Subscription found: {subscription}")
-                subscription.plan = plan
-                subscription.stripe_subscription_id = subscription_id
-                subscription.is_active = True
-                subscription.status = stripe_subscription["status"]
-                subscription.current_period_start = current_period_start
-                subscription.current_period_end = current_period_end
-                subscription.is_expired = False
-            except Subscription.DoesNotExist:
-                logger.debug("No existing Subscription found. Creating a new one.")
-                subscription = Subscription(
-                    agency=agency,
-                    plan=plan,
-                    stripe_subscription_id=subscription_id,
-                    is_active=True,
-                    status=stripe_subscription["status"],
-                    current_period_start=current_period_start,
-                    current_period_end=current_period_end,
-                    is_expired=False,
-                )
-
-            subscription.full_clean()
-            subscription.save()
+            subscription, created = Subscription.objects.update_or_create(
+                agency=agency,
+                defaults={
+                    "plan": plan,
+                    "stripe_subscription_id": subscription_id,
+                    "is_active": True,
+                    "status": stripe_subscription["status"],
+                    "current_period_start": current_period_start,
+                    "current_period_end": current_period_end,
+                    "is_expired": False,
+                },
+            )
+            logger.debug(
+                f"Subscription {subscription_id} {'created' if created else 'updated'} for agency {agency.name}"
+            )
+            invalidate_stripe_cache(subscription_id, customer_id)
             logger.info(f"Subscription updated for agency {agency.name}")
 
         except Agency.DoesNotExist:
@@ -429,8 +402,10 @@ class StripeWebhookView(View):
         except Plan.DoesNotExist:
             logger.exception(f"Plan with price ID {plan_id} does not exist.")
             return HttpResponse(status=400)
-        except ValidationError as ve:
-            logger.exception(f"Validation error while updating subscription: {ve}")
+        except IntegrityError as e:
+            logger.exception(
+                f"Subscription {subscription_id} conflicts with an existing subscription: {e}"
+            )
             return HttpResponse(status=400)
         except Exception as e:
             logger.exception(f"Unexpected error while handling checkout session: {e}")
@@ -440,12 +415,10 @@ class StripeWebhookView(View):
         stripe_subscription_id = subscription.get("id")
         customer_id = subscription.get("customer")
         plan_id = subscription["items"]["data"][0]["price"]["id"]
-        current_period_start = datetime.fromtimestamp(
-            subscription["current_period_start"], tz=datetime_timezone.utc
-        )
-        current_period_end = datetime.fromtimestamp(
-            subscription["current_period_end"], tz=datetime_timezone.utc
+        current_period_start = from_stripe_timestamp(
+            subscription["current_period_start"]
         )
+        current_period_end = from_stripe_timestamp(subscription["current_period_end"])
 
         logger.info(f"Subscription created: {stripe_subscription_id}")
 
@@ -453,13 +426,16 @@ class StripeWebhookView(View):
             agency = Agency.objects.get(stripe_customer_id=customer_id)
             logger.debug(f"Found Agency: {agency.name}")
 
-            plan = Plan.objects.get(stripe_price_id=plan_id)
+            plan = get_plan_by_price_id(plan_id)
             logger.debug(f"Found Plan: {plan.name}")
 
-            subscription_record, created = Subscription.objects.get_or_create(
-                stripe_subscription_id=stripe_subscription_id,
+            # Keyed on the agency, like the checkout handler: an agency has a
+            # single subscription row, so a new Stripe subscription replaces
+            # a previously canceled one rather than colliding with it
+            _, created = Subscription.objects.update_or_create(
                 agency=agency,
                 defaults={
+                    "stripe_subscription_id": stripe_subscription_id,
                     "plan": plan,
                     "is_active": True,
                     "status": subscription.get("status", "active"),
@@ -468,33 +444,20 @@ class StripeWebhookView(View):
                     "is_expired": False,
                 },
             )
+            logger.debug(
+                f"Subscription {stripe_subscription_id} {'created' if created else 'updated'} for agency {agency.name}"
+            )
 
-            if not created:
-                # Update existing subscription if it wasn't newly created
-                subscription_record.plan = plan
-                subscription_record.is_active = True
-                subscription_record.status = subscription.get("status", "active")
-                subscription_record.current_period_start = current_period_start
-                subscription_record.current_period_end = current_period_end
-                subscription_record.is_expired = False
-                subscription_record.save()
-                logger.debug(
-                    f"Subscription {stripe_subscription_id} updated for agency {agency.name}"
-                )
-            else:
-                logger.debug(
-                    f"Subscription {stripe_subscription_id} created for agency {agency.name}"
-                )
-
+            invalidate_stripe_cache(stripe_subscription_id, customer_id)
             logger.info(f"Subscription record handled for agency {agency.name}")
 
         except Agency.DoesNotExist:
             logger.exception(f"Agency with customer ID {customer_id} does not exist.")
         except Plan.DoesNotExist:
             logger.exception(f"Plan with price ID {plan_id} does not exist.")
-        except ValidationError as ve:
+        except IntegrityError as e:
             logger.exception(
-                f"Validation error while creating/updating subscription: {ve}"
+                f"Subscription {stripe_subscription_id} conflicts with an existing subscription: {e}"
             )
         except Exception as e:
             logger.exception(
@@ -518,15 +481,19 @@ class SubscriptionChangeView(
         if not self.change_type:
             raise NotImplementedError("Change type must be defined in subclasses.")
 
-        try:
-            profile = user.profile
-            agency = profile.agency
-            subscription = agency.subscription
+        ctx, error_redirect = resolve_agency_context(
+            self.request, require_subscription=True
+        )
+        if error_redirect is not None:
+            return context
+        subscription = ctx.subscription
 
+        try:
             # Check if subscription is active in local DB
             if not subscription.is_active:
                 messages.error(
-                    request, "Your subscription is not active and cannot be modified."
+                    self.request,
+                    "Your subscription is not active and cannot be modified.",
                 )
                 logger.warning(
                     f"User {user.username} attempted to modify an inactive subscription."
@@ -535,14 +502,15 @@ class SubscriptionChangeView(
                 return context
 
             # Retrieve the latest subscription status from Stripe
-            stripe_subscription = stripe.Subscription.retrieve(
+            stripe_subscription = get_or_fetch_subscription(
                 subscription.stripe_subscription_id
             )
 
             # Check if subscription is active in Stripe
             if stripe_subscription["status"] != "active":
                 messages.error(
-                    request, "Your subscription is not active and cannot be modified."
+                    self.request,
+                    "Your subscription is not active and cannot be modified.",
                 )
                 logger.warning(
                     f"User {user.username} attempted to modify a Stripe subscription with status {stripe_subscription['status']}."
@@ -551,22 +519,27 @@ class SubscriptionChangeView(
                 # Update local subscription status
                 subscription.is_active = False
                 subscription.status = stripe_subscription["status"]
-                subscription.save()
+                subscription.save(update_fields=["is_active", "status", "updated_at"])
 
                 context["available_plans"] = []
                 return context
 
-            # Determine available plans based on change type
+            # Determine available plans based on change type; the plan was
+            # loaded with the subscription, so this is the only plan query
+            current_price = subscription.plan.price
+            active_plans = Plan.objects.filter(is_active=True).only(
+                *PLAN_LISTING_FIELDS
+            )
             if self.change_type == "upgrade":
-                filtered_plans = Plan.objects.filter(
-                    price__gt=subscription.plan.price, is_active=True
-                ).order_by("price")
+                filtered_plans = active_plans.filter(price__gt=current_price).order_by(
+                    "price"
+                )
                 form_title = "Upgrade Your Subscription"
                 button_label = "Upgrade Subscription"
             elif self.change_type == "downgrade":
-                filtered_plans = Plan.objects.filter(
-                    price__lt=subscription.plan.price, is_active=True
-                ).order_by("-price")
+                filtered_plans = active_plans.filter(price__lt=current_price).order_by(
+                    "-price"
+                )
                 form_title = "Downgrade Your Subscription"
                 button_label = "Downgrade Subscription"
             else:
@@ -575,53 +548,12 @@ class SubscriptionChangeView(
                 button_label = "Change Subscription"
 
             # Group plans by name and billing cycle
-            plan_dict = defaultdict(dict)
-            for plan in filtered_plans:
-                if plan.billing_cycle.lower() == "monthly":
-                    plan_dict[plan.name]["monthly_plan"] = plan
-                elif plan.billing_cycle.lower() == "yearly":
-                    plan_dict[plan.name]["yearly_plan"] = plan
-
-            # Structure available_plans as a list of dictionaries
-            available_plans = []
-            for plan_name, plans in plan_dict.items():
-                if not plans.get("monthly_plan") and not plans.get("yearly_plan"):
-                    logger.warning(
-                        f"No monthly or yearly plan found for {plan_name}. Skipping."
-                    )
-                    continue
-
-                description = (
-                    plans.get("monthly_plan").description
-                    if plans.get("monthly_plan")
-                    else plans.get("yearly_plan").description
-                )
-
-                available_plans.append(
-                    {
-                        "name": plan_name,
-                        "description": description,
-                        "monthly_plan": plans.get("monthly_plan"),
-                        "yearly_plan": plans.get("yearly_plan"),
-                    }
-                )
+            available_plans = group_plans_by_name(filtered_plans)
 
             context["available_plans"] = available_plans
             context["form_title"] = form_title
             context["button_label"] = button_label
 
-        except Profile.DoesNotExist:
-            messages.error(
-                self.request, "User profile does not exist. Please contact support."
-            )
-            logger.error(f"Profile does not exist for user: {user.username}")
-        except Subscription.DoesNotExist:
-            messages.error(
-                self.request, "Active subscription not found. Please subscribe first."
-            )
-            logger.error(
-                f"No active subscription for agency: {agency.name if agency else 'N/A'}"
-            )
         except stripe.error.StripeError as e:
             messages.error(
                 self.request,
@@ -647,11 +579,12 @@ class SubscriptionChangeView(
 
         user = request.user
 
-        try:
-            profile = user.profile
-            agency = profile.agency
-            subscription = agency.subscription
+        ctx, error_redirect = resolve_agency_context(request, require_subscription=True)
+        if error_redirect is not None:
+            return error_redirect
+        subscription = ctx.subscription
 
+        try:
             # Double-check if subscription is active locally
             if not subscription.is_active:
                 messages.error(
@@ -662,7 +595,8 @@ class SubscriptionChangeView(
                 )
                 return redirect("subscriptions:manage_subscription")
 
-            # Retrieve the latest subscription status from Stripe
+            # Always read Stripe directly here: the cache is per process, and
+            # its status and item id must not decide a write to Stripe
             stripe_subscription = stripe.Subscription.retrieve(
                 subscription.stripe_subscription_id
             )
@@ -679,7 +613,7 @@ class SubscriptionChangeView(
                 # Update local subscription status
                 subscription.is_active = False
                 subscription.status = stripe_subscription["status"]
-                subscription.save()
+                subscription.save(update_fields=["is_active", "status", "updated_at"])
 
                 return redirect("subscriptions:manage_subscription")
 
@@ -698,9 +632,13 @@ class SubscriptionChangeView(
                 proration_behavior="create_prorations",
             )
 
+            invalidate_stripe_cache(
+                subscription.stripe_subscription_id, ctx.agency.stripe_customer_id
+            )
+
             # Update local subscription
             subscription.plan = new_plan
-            subscription.save()
+            subscription.save(update_fields=["plan", "updated_at"])
 
             action = "upgraded" if self.change_type == "upgrade" else "downgraded"
             messages.success(
@@ -711,14 +649,6 @@ class SubscriptionChangeView(
             )
             return redirect("subscriptions:manage_subscription")
 
-        except Subscription.DoesNotExist:
-            messages.error(
-                request, "Active subscription not found. Please subscribe first."
-            )
-            logger.error(
-                f"No active subscription for agency: {agency.name if agency else 'N/A'}"
-            )
-            return redirect("subscriptions:subscription_home")
         except stripe.error.StripeError as e:
             messages.error(
                 request,
@@ -742,51 +672,37 @@ class DowngradeSubscriptionView(SubscriptionChangeView):
 
 class CancelSubscriptionView(LoginRequiredMixin, AgencyOwnerRequiredMixin, View):
     def post(self, request, *args, **kwargs):
-        user = request.user
-
-        try:
-            profile = user.profile
-        except Profile.DoesNotExist:
-            messages.error(
-                request, "User profile does not exist. Please contact support."
-            )
-            logger.error(f"Profile does not exist for user: {user.username}")
-            return redirect("subscriptions:subscription_home")
-
-        agency = profile.agency
-
-        if not agency:
-            messages.error(
-                request,
-                "Your agency information is missing. Please contact support.",
-            )
-            logger.error(f"Agency is None for user: {user.username}")
-            return redirect("subscriptions:subscription_home")
-
-        if not agency.stripe_customer_id:
-            messages.error(
-                request, "No Stripe customer ID found. Please contact support."
-            )
-            logger.error(f"Stripe customer ID is missing for agency: {agency.name}")
-            return redirect("subscriptions:subscription_home")
+        ctx, error_redirect = resolve_agency_context(request, require_stripe=True)
+        if error_redirect is not None:
+            return error_redirect
+        agency = ctx.agency
 
         try:
             subscriptions = stripe.Subscription.list(
                 customer=agency.stripe_customer_id, status="active"
             )
 
-            for subscription in subscriptions.auto_paging_iter():
-                stripe.Subscription.delete(subscription.id)
-                local_subscription = Subscription.objects.filter(
-                    stripe_subscription_id=subscription.id
-                ).first()
-                if local_subscription:
-                    local_subscription.is_active = False
-                    local_subscription.status = "canceled"
-                    local_subscription.save()
-                    logger.info(
-                        f"Subscription {subscription.id} deactivated for agency: {agency.name}"
-                    )
+            subscription_ids = [
+                subscription.id for subscription in subscriptions.auto_paging_iter()
+            ]
+            canceled_ids, failed_ids = cancel_stripe_subscriptions(subscription_ids)
+
+            if canceled_ids:
+                updated = Subscription.objects.filter(
+                    stripe_subscription_id__in=canceled_ids
+                ).update(is_active=False, status="canceled", updated_at=timezone.now())
+                for subscription_id in canceled_ids:
+                    invalidate_stripe_cache(subscription_id, agency.stripe_customer_id)
+                logger.info(
+                    f"{updated} subscription(s) deactivated for agency: {agency.name}"
+                )
+
+            if failed_ids:
+                messages.error(
+                    request,
+                    "Some of your subscriptions could not be cancelled. Please try again.",
+                )
+                return redirect("subscriptions:subscription_home")
 
             messages.success(request, "Your subscription has been cancelled.")
             return redirect("subscriptions:subscription_home")
@@ -807,82 +723,52 @@ class ManageSubscriptionView(
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-
-        try:
-            profile = user.profile
-        except Profile.DoesNotExist:
-            messages.error(
-                self.request, "User profile does not exist. Please contact support."
-            )
-            logger.error(f"Profile does not exist for user: {user.username}")
-            return context
-
-        agency = profile.agency
-
-        if not agency:
-            messages.error(
-                self.request,
-                "Your agency information is missing. Please contact support.",
-            )
-            logger.error(f"Agency is None for user: {user.username}")
-            return context
-
-        if not agency.stripe_customer_id:
-            messages.error(
-                self.request, "No Stripe customer ID found. Please contact support."
-            )
-            logger.error(f"Stripe customer ID is missing for agency: {agency.name}")
+        ctx, error_redirect = resolve_agency_context(self.request, require_stripe=True)
+        if error_redirect is not None:
             return context
+        agency, subscription = ctx.agency, ctx.subscription
 
         try:
-            # Fetch subscription from local database
-            try:
-                subscription = agency.subscription
-                if (
-                    subscription.is_active
-                    and subscription.current_period_end
-                    and subscription.current_period_end > timezone.now()
-                ):
-                    context["subscription"] = subscription
-                else:
-                    context["subscription"] = None
-            except Subscription.DoesNotExist:
+            # Subscription from the local database
+            if (
+                subscription
+                and subscription.is_active
+                and subscription.current_period_end
+                and subscription.current_period_end > timezone.now()
+            ):
+                context["subscription"] = subscription
+            else:
                 context["subscription"] = None
-                logger.warning(f"No active subscription for agency: {agency.name}")
-
-            # Fetch subscriptions from Stripe
-            subscriptions = stripe.Subscription.list(
-                customer=agency.stripe_customer_id, limit=10
-            )
-            context["subscriptions"] = subscriptions
+                if subscription is None:
+                    logger.warning(f"No active subscription for agency: {agency.name}")
 
-            # Generate Billing Portal session link
-            billing_portal_session = stripe.billing_portal.Session.create(
-                customer=agency.stripe_customer_id,
-                return_url=self.request.build_absolute_uri(
-                    reverse("subscriptions:manage_subscription")
-                ),
+            # Recent subscriptions from Stripe, cached between page loads.
+            # The Billing Portal session is only created when the user opens
+            # it, via UpdatePaymentMethodView
+            context["subscriptions"] = get_or_fetch_customer_subscriptions(
+                agency.stripe_customer_id
             )
-            context["billing_portal_url"] = billing_portal_session.url
 
             # Determine available plans for upgrade and downgrade
+            # One query for both lists, split by price in Python
+            active_plans = (
+                Plan.objects.filter(is_active=True)
+                .only("id", "name", "price")
+                .order_by("price")
+            )
             if subscription and subscription.is_active:
-                current_plan = subscription.plan
+                current_price = subscription.plan.price
+                plans = list(active_plans.exclude(id=subscription.plan_id))
                 # For upgrade: plans with higher price
-                upgrade_plans = Plan.objects.filter(
-                    price__gt=current_plan.price, is_active=True
-                ).order_by("price")
-                # For downgrade: plans with lower price
-                downgrade_plans = Plan.objects.filter(
-                    price__lt=current_plan.price, is_active=True
-                ).order_by("-price")
-                context["upgrade_plans"] = upgrade_plans
-                context["downgrade_plans"] = downgrade_plans
+                context["upgrade_plans"] = [
+                    plan for plan in plans if plan.price > current_price
+                ]
+                # For downgrade: plans with lower price, most expensive first
+                context["downgrade_plans"] = [
+                    plan for plan in reversed(plans) if plan.price < current_price
+                ]
             else:
-                context["upgrade_plans"] = Plan.objects.filter(is_active=True).order_by(
-                    "price"
-                )
+                context["upgrade_plans"] = active_plans
                 context["downgrade_plans"] = []
 
         except stripe.error.StripeError as e:
@@ -900,52 +786,63 @@ class ManageSubscriptionView(
 
 
 class UpdatePaymentMethodView(LoginRequiredMixin, AgencyOwnerRequiredMixin, View):
-    def get(self, request, *args, **kwargs):
-        user = request.user
-
-        try:
-            profile = user.profile
-        except Profile.DoesNotExist:
-            messages.error(
-                request, "User profile does not exist. Please contact support."
-            )
-            logger.error(f"Profile does not exist for user: {user.username}")
-            return redirect("subscriptions:subscription_home")
+    error_message = "Unable to redirect to Billing Portal."
 
-        agency = profile.agency
+    def error_response(self, request, status=502, flashed=False):
+        """
+        Redirects browsers home with a flash message, unless one was already
+        queued. Clients that do not accept HTML get a JSON error instead of a
+        redirect and a messages cookie they would never render.
+        """
+        if not request.accepts("text/html"):
+            return JsonResponse({"error": self.error_message}, status=status)
+        if not flashed:
+            messages.error(request, self.error_message)
+        return HttpResponseRedirect(subscription_path("subscription_home"))
 
-        if not agency:
-            messages.error(
-                request, "Your agency information is missing. Please contact support."
-            )
-            logger.error(f"Agency is None for user: {user.username}")
-            return redirect("subscriptions:subscription_home")
+    def post(self, request, *args, **kwargs):
+        return self.get(request, *args, **kwargs)
 
-        if not agency.stripe_customer_id:
-            messages.error(
-                request, "No Stripe customer ID found. Please contact support."
-            )
-            logger.error(f"Stripe customer ID is missing for agency: {agency.name}")
-            return redirect("subscriptions:subscription_home")
+    def get(self, request, *args, **kwargs):
+        wants_html = request.accepts("text/html")
+        ctx, error_redirect = resolve_agency_context(
+            request, require_stripe=True, flash=wants_html
+        )
+        if error_redirect is not None:
+            return self.error_response(request, status=400, flashed=wants_html)
+        agency = ctx.agency
+        # Each outcome logs exactly one record carrying the request's context
+        log_extra = {
+            "agency": agency.name,
+            "user": request.user.username,
+            "customer": agency.stripe_customer_id,
+        }
 
         try:
-            session = stripe.billing_portal.Session.create(
-                customer=agency.stripe_customer_id,
-                return_url=self.request.build_absolute_uri(
-                    reverse("subscriptions:manage_subscription")
+            portal_url = get_or_create_billing_portal_url(
+                agency.stripe_customer_id,
+                self.request.build_absolute_uri(
+                    subscription_path("manage_subscription")
                 ),
             )
-            logger.info(
-                f"Billing Portal session created: {session.id} for agency: {agency.name}"
+        except (stripe.error.APIConnectionError, stripe.error.RateLimitError) as e:
+            # Transient Stripe failures; the message says all there is to know
+            logger.error(
+                "Stripe unavailable while creating Billing Portal session: %s",
+                e,
+                extra={**log_extra, "outcome": "stripe_unavailable"},
             )
-            return redirect(session.url)
+            return self.error_response(request)
         except stripe.error.StripeError as e:
-            messages.error(request, "Unable to redirect to Billing Portal.")
-            logger.exception(f"Stripe error while creating Billing Portal session: {e}")
-            return redirect("subscriptions:subscription_home")
-        except Exception as e:
-            messages.error(request, "An unexpected error occurred. Please try again.")
             logger.exception(
-                f"Unexpected error while creating Billing Portal session: {e}"
-            )
-            return redirect("subscriptions:subscription_home")
+                "Stripe error while creating Billing Portal session: %s",
+                e,
+                extra={**log_extra, "outcome": "stripe_error"},
+            )
+            return self.error_response(request)
+        logger.info(
+            "Billing Portal session ready for customer: %s",
+            agency.stripe_customer_id,
+            extra={**log_extra, "outcome": "ok"},
+        )
+        return redirect(portal_url)